@@ -1,107 +1,179 @@
 import tkinter as tk
 from tkinter import messagebox, scrolledtext, filedialog
-from bs4 import BeautifulSoup
 import webbrowser
-import csv
-import json
-import pandas as pd
+import os
+import sys
+import threading
+from htmlexport import EXPORTERS, export_records
+from htmlextract import DEFAULT_PARSER, FAST_PARSER_NOTE, FIELDS, PARSERS, ExtractionCancelled, extract_records
+
+# 추출은 작업 스레드에서 하고, 메인 스레드가 root.after 로 진행 상황/결과를 가져간다.
+# 작업마다 상태 dict 를 새로 만들고 현재 작업(extract_job)이 아니면 결과를 버린다.
+POLL_MS = 100
+extract_job = None
 
 def extract_text():
+    global extract_job
     html_content = html_text.get(1.0, tk.END)
     tag = tag_entry.get().strip()
     class_name = class_entry.get().strip()
     extract_links = links_var.get()
     extract_images = images_var.get()
+    parser = parser_var.get()
 
     if not tag:
         messagebox.showwarning("입력 부족", "태그 이름을 입력해주세요.")
         return
+    if extract_job is not None:
+        return
+
+    job = {'elements': 0, 'matches': 0, 'records': None, 'error': None, 'done': False,
+           'cancel': threading.Event()}
 
-    try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        if class_name:
-            elements = soup.find_all(tag, class_=class_name)
+    def progress(elements, matches):
+        job['elements'] = elements
+        job['matches'] = matches
+
+    def work():
+        try:
+            job['records'] = extract_records(html_content, tag, class_name, extract_links, extract_images, parser,
+                                             progress=progress, cancel=job['cancel'])
+        except ExtractionCancelled:
+            pass
+        except Exception as e:
+            job['error'] = e
+        finally:
+            job['done'] = True
+
+    extract_job = job
+    extract_button.config(state=tk.DISABLED)
+    cancel_button.config(state=tk.NORMAL)
+    status_var.set("추출 중...")
+    threading.Thread(target=work, name="extract", daemon=True).start()
+    root.after(POLL_MS, poll_extraction, job)
+
+def poll_extraction(job):
+    if job is not extract_job:
+        return
+    if not job['done']:
+        if job['elements']:
+            status_var.set(f"추출 중... 요소 {job['elements']:,}개 확인, {job['matches']:,}개 일치")
         else:
-            elements = soup.find_all(tag)
+            status_var.set("HTML 파싱 중...")
+        root.after(POLL_MS, poll_extraction, job)
+        return
 
-        if not elements:
-            result_text.config(state=tk.NORMAL)
-            result_text.delete(1.0, tk.END)
-            result_text.insert(tk.END, "해당 조건에 맞는 요소가 없습니다.")
-            result_text.config(state=tk.DISABLED)
-            return
+    finish_extraction()
+    if job['error'] is not None:
+        status_var.set("")
+        messagebox.showerror("오류", f"텍스트 추출 중 오류가 발생했습니다:\n{job['error']}")
+        return
+
+    records = job['records']
+    status_var.set(f"요소 {job['elements']:,}개 중 {len(records):,}개 추출")
+    if not records:
+        show_result_message("해당 조건에 맞는 요소가 없습니다.")
+        return
 
-        extracted_data.clear()
-        result_text.config(state=tk.NORMAL)
-        result_text.delete(1.0, tk.END)
-
-        for idx, element in enumerate(elements, start=1):
-            text = element.get_text(separator=' ', strip=True)
-            line = f"요소 {idx}:\n  텍스트: {text}\n"
-            
-            links = []
-            images = []
-
-            if extract_links:
-                a_tags = element.find_all('a', href=True)
-                links = [a['href'] for a in a_tags]
-                if links:
-                    line += f"  링크:\n"
-                    for link in links:
-                        line += f"    - {link}\n"
-
-            if extract_images:
-                img_tags = element.find_all('img', src=True)
-                images = [img['src'] for img in img_tags]
-                if images:
-                    line += f"  이미지 경로:\n"
-                    for img in images:
-                        line += f"    - {img}\n"
-
-            extracted_data.append({
-                '요소 번호': idx,
-                '텍스트': text,
-                '링크': links,
-                '이미지 경로': images
-            })
-
-            # Insert text into Text widget with clickable links
-            result_text.insert(tk.END, f"요소 {idx}:\n")
-            result_text.insert(tk.END, f"  텍스트: {text}\n")
-
-            if links:
-                result_text.insert(tk.END, f"  링크:\n")
-                for link in links:
-                    link_start = result_text.index(tk.END)
-                    result_text.insert(tk.END, f"    - {link}\n")
-                    link_end = result_text.index(tk.END)
-                    # Add tag for the link
-                    tag_name = f"link{idx}_{links.index(link)}"
-                    result_text.tag_add(tag_name, link_start, link_end)
-                    result_text.tag_bind(tag_name, "<Button-1>", lambda e, url=link: open_url(url))
-                    result_text.tag_config(tag_name, foreground="blue", underline=1)
-
-            if images:
-                result_text.insert(tk.END, f"  이미지 경로:\n")
-                for img in images:
-                    img_start = result_text.index(tk.END)
-                    result_text.insert(tk.END, f"    - {img}\n")
-                    img_end = result_text.index(tk.END)
-                    # Add tag for the image
-                    tag_name = f"image{idx}_{images.index(img)}"
-                    result_text.tag_add(tag_name, img_start, img_end)
-                    result_text.tag_bind(tag_name, "<Button-1>", lambda e, url=img: open_url(url))
-                    result_text.tag_config(tag_name, foreground="blue", underline=1)
-
-        result_text.config(state=tk.DISABLED)
-
-    except Exception as e:
-        messagebox.showerror("오류", f"텍스트 추출 중 오류가 발생했습니다:\n{e}")
+    extracted_data.clear()
+    extracted_data.extend(records)
+    render_records(records)
+
+def cancel_extraction():
+    # 파싱 단계는 중간에 멈출 수 없으므로, 작업 스레드는 다음 확인 시점에 끝나고 결과는 버린다
+    if extract_job is not None:
+        extract_job['cancel'].set()
+        finish_extraction()
+        status_var.set("추출을 취소했습니다.")
+
+def finish_extraction():
+    global extract_job
+    extract_job = None
+    extract_button.config(state=tk.NORMAL)
+    cancel_button.config(state=tk.DISABLED)
+
+# 결과 창은 RENDER_BATCH 개 요소씩 한 번의 insert 로 나눠 그리고, 배치 사이에 화면을 갱신한다.
+# 링크/이미지 줄은 공유 태그 "link" 하나만 쓰고 클릭한 줄 번호로 URL 을 찾는다.
+RENDER_BATCH = 300
+link_urls = {}
+render_list = []
+render_next = 0
+render_line = 1
+render_job = None
+
+def cancel_render():
+    global render_job
+    if render_job is not None:
+        root.after_cancel(render_job)
+        render_job = None
+
+def show_result_message(message):
+    cancel_render()
+    link_urls.clear()
+    result_text.config(state=tk.NORMAL)
+    result_text.delete(1.0, tk.END)
+    result_text.insert(tk.END, message)
+    result_text.config(state=tk.DISABLED)
+
+def render_records(records):
+    global render_list, render_next, render_line
+    show_result_message("")
+    render_list = records
+    render_next = 0
+    render_line = 1
+    render_batch()
+
+def render_batch(count=RENDER_BATCH):
+    global render_job, render_next, render_line
+    render_job = None
+    end = min(render_next + count, len(render_list))
+    # insert 인자: 텍스트, 태그, 텍스트, 태그, ...
+    args = []
+    plain = []
+    line = render_line
+    for record in render_list[render_next:end]:
+        plain.append(f"요소 {record['요소 번호']}:\n  텍스트: {record['텍스트']}\n")
+        for label, urls in (("링크", record['링크']), ("이미지 경로", record['이미지 경로'])):
+            if not urls:
+                continue
+            plain.append(f"  {label}:\n")
+            for url in urls:
+                chunk = ''.join(plain)
+                plain.clear()
+                line += chunk.count('\n')
+                link_urls[line] = url
+                entry = f"    - {url}\n"
+                line += entry.count('\n')
+                args += [chunk, (), entry, ("link",)]
+    chunk = ''.join(plain)
+    line += chunk.count('\n')
+    args += [chunk, ()]
+
+    result_text.config(state=tk.NORMAL)
+    result_text.insert(tk.END, *args)
+    result_text.config(state=tk.DISABLED)
+    render_next = end
+    render_line = line
+    if render_next < len(render_list):
+        render_job = root.after(1, render_batch)
+
+def finish_render():
+    # 남은 배치를 바로 그린다 (텍스트 저장 전)
+    if render_job is not None:
+        cancel_render()
+        render_batch(len(render_list))
+
+def on_link_click(event):
+    line = int(result_text.index(f"@{event.x},{event.y}").split('.')[0])
+    url = link_urls.get(line)
+    if url is not None:
+        open_url(url)
 
 def open_url(url):
     webbrowser.open_new(url)
 
 def save_text():
+    finish_render()
     extracted = result_text.get(1.0, tk.END).strip()
     if not extracted or extracted == "해당 조건에 맞는 요소가 없습니다.":
         messagebox.showwarning("저장 실패", "추출된 텍스트가 없습니다.")
@@ -126,33 +198,16 @@ def save_structured_data():
 
     file_type = filedialog.asksaveasfilename(
         defaultextension=".json",
-        filetypes=[("JSON 파일", "*.json"), ("CSV 파일", "*.csv"), ("Excel 파일", "*.xlsx"), ("모든 파일", "*.*")]
+        filetypes=[("JSON 파일", "*.json"), ("JSON Lines 파일", "*.jsonl"), ("CSV 파일", "*.csv"),
+                   ("Excel 파일", "*.xlsx"), ("Parquet 파일", "*.parquet"), ("모든 파일", "*.*")]
     )
     if file_type:
+        if os.path.splitext(file_type)[1].lower() not in EXPORTERS:
+            messagebox.showwarning("지원하지 않는 형식", "선택한 파일 형식을 지원하지 않습니다.")
+            return
         try:
-            if file_type.endswith('.json'):
-                with open(file_type, 'w', encoding='utf-8') as file:
-                    json.dump(extracted_data, file, ensure_ascii=False, indent=4)
-            elif file_type.endswith('.csv'):
-                with open(file_type, 'w', encoding='utf-8', newline='') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['요소 번호', '텍스트', '링크', '이미지 경로'])
-                    for data in extracted_data:
-                        writer.writerow([
-                            data['요소 번호'],
-                            data['텍스트'],
-                            "; ".join(data['링크']) if data['링크'] else "",
-                            "; ".join(data['이미지 경로']) if data['이미지 경로'] else ""
-                        ])
-            elif file_type.endswith('.xlsx'):
-                df = pd.DataFrame(extracted_data)
-                # Convert lists to semicolon-separated strings for Excel
-                df['링크'] = df['링크'].apply(lambda x: "; ".join(x) if x else "")
-                df['이미지 경로'] = df['이미지 경로'].apply(lambda x: "; ".join(x) if x else "")
-                df.to_excel(file_type, index=False)
-            else:
-                messagebox.showwarning("지원하지 않는 형식", "선택한 파일 형식을 지원하지 않습니다.")
-                return
+            # 행 단위로 바로 파일에 쓴다 (JSON/CSV 는 기존과 같은 형식)
+            export_records(file_type, extracted_data, FIELDS)
             messagebox.showinfo("성공", f"구조화된 데이터가 성공적으로 저장되었습니다:\n{file_type}")
         except Exception as e:
             messagebox.showerror("오류", f"데이터 저장 중 오류가 발생했습니다:\n{e}")
@@ -160,68 +215,96 @@ def save_structured_data():
 # 전역 변수로 추출된 데이터를 저장할 리스트
 extracted_data = []
 
-# Tkinter 창 설정
-root = tk.Tk()
-root.title("HTML 텍스트 추출기")
-root.geometry("900x850")
+if __name__ == "__main__":
+    # 인자가 있으면 창 없이 여러 HTML 파일 일괄 추출 (python crawlingdalbong.py pages/ -t div -o out.jsonl)
+    if len(sys.argv) > 1:
+        from htmlextract import main
+        sys.exit(main())
+
+    # Tkinter 창 설정
+    root = tk.Tk()
+    root.title("HTML 텍스트 추출기")
+    root.geometry("900x850")
+
+    # HTML 내용 입력 섹션
+    html_frame = tk.LabelFrame(root, text="HTML 내용 붙여넣기")
+    html_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+
+    html_text = scrolledtext.ScrolledText(html_frame, wrap=tk.WORD, height=20)
+    html_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+    # 태그 및 클래스 입력 섹션
+    input_frame = tk.Frame(root)
+    input_frame.pack(pady=10)
+
+    tag_label = tk.Label(input_frame, text="태그 이름:")
+    tag_label.grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
 
-# HTML 내용 입력 섹션
-html_frame = tk.LabelFrame(root, text="HTML 내용 붙여넣기")
-html_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    tag_entry = tk.Entry(input_frame, width=30)
+    tag_entry.grid(row=0, column=1, padx=5, pady=5)
 
-html_text = scrolledtext.ScrolledText(html_frame, wrap=tk.WORD, height=20)
-html_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    class_label = tk.Label(input_frame, text="클래스 이름 (선택):")
+    class_label.grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
 
-# 태그 및 클래스 입력 섹션
-input_frame = tk.Frame(root)
-input_frame.pack(pady=10)
+    class_entry = tk.Entry(input_frame, width=30)
+    class_entry.grid(row=1, column=1, padx=5, pady=5)
 
-tag_label = tk.Label(input_frame, text="태그 이름:")
-tag_label.grid(row=0, column=0, padx=5, pady=5, sticky=tk.E)
+    # 추가 옵션 섹션
+    options_frame = tk.Frame(root)
+    options_frame.pack(pady=10)
 
-tag_entry = tk.Entry(input_frame, width=30)
-tag_entry.grid(row=0, column=1, padx=5, pady=5)
+    links_var = tk.BooleanVar()
+    images_var = tk.BooleanVar()
 
-class_label = tk.Label(input_frame, text="클래스 이름 (선택):")
-class_label.grid(row=1, column=0, padx=5, pady=5, sticky=tk.E)
+    links_check = tk.Checkbutton(options_frame, text="a href 링크 추출", variable=links_var)
+    links_check.grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
 
-class_entry = tk.Entry(input_frame, width=30)
-class_entry.grid(row=1, column=1, padx=5, pady=5)
+    images_check = tk.Checkbutton(options_frame, text="img src 이미지 경로 추출", variable=images_var)
+    images_check.grid(row=0, column=1, padx=10, pady=5, sticky=tk.W)
 
-# 추가 옵션 섹션
-options_frame = tk.Frame(root)
-options_frame.pack(pady=10)
+    # 파서 선택 (기본: html.parser, 빠른 파서는 직접 고를 때만)
+    parser_var = tk.StringVar(value=DEFAULT_PARSER)
+    parser_label = tk.Label(options_frame, text="파서:")
+    parser_label.grid(row=0, column=2, padx=(10, 0), pady=5, sticky=tk.E)
+    parser_menu = tk.OptionMenu(options_frame, parser_var, *PARSERS)
+    parser_menu.grid(row=0, column=3, padx=5, pady=5, sticky=tk.W)
+    parser_note = tk.Label(options_frame, text=FAST_PARSER_NOTE, fg="gray")
+    parser_note.grid(row=1, column=0, columnspan=4, padx=10, sticky=tk.W)
 
-links_var = tk.BooleanVar()
-images_var = tk.BooleanVar()
+    # 추출 버튼
+    extract_buttons_frame = tk.Frame(root)
+    extract_buttons_frame.pack(pady=10)
 
-links_check = tk.Checkbutton(options_frame, text="a href 링크 추출", variable=links_var)
-links_check.grid(row=0, column=0, padx=10, pady=5, sticky=tk.W)
+    extract_button = tk.Button(extract_buttons_frame, text="텍스트 추출", command=extract_text, width=20, bg="lightblue")
+    extract_button.grid(row=0, column=0, padx=10)
 
-images_check = tk.Checkbutton(options_frame, text="img src 이미지 경로 추출", variable=images_var)
-images_check.grid(row=0, column=1, padx=10, pady=5, sticky=tk.W)
+    cancel_button = tk.Button(extract_buttons_frame, text="취소", command=cancel_extraction, width=10, state=tk.DISABLED)
+    cancel_button.grid(row=0, column=1, padx=10)
 
-# 추출 버튼
-extract_button = tk.Button(root, text="텍스트 추출", command=extract_text, width=20, bg="lightblue")
-extract_button.pack(pady=10)
+    # 진행 상황 표시
+    status_var = tk.StringVar()
+    status_label = tk.Label(root, textvariable=status_var)
+    status_label.pack()
 
-# 결과 표시 섹션
-result_frame = tk.LabelFrame(root, text="추출된 텍스트")
-result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+    # 결과 표시 섹션
+    result_frame = tk.LabelFrame(root, text="추출된 텍스트")
+    result_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
-result_text = scrolledtext.ScrolledText(result_frame, wrap=tk.WORD, height=25, fg="green")
-result_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
-result_text.config(state=tk.DISABLED)
+    result_text = scrolledtext.ScrolledText(result_frame, wrap=tk.WORD, height=25, fg="green")
+    result_text.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+    result_text.config(state=tk.DISABLED)
+    result_text.tag_config("link", foreground="blue", underline=1)
+    result_text.tag_bind("link", "<Button-1>", on_link_click)
 
-# 저장 버튼 섹션
-save_buttons_frame = tk.Frame(root)
-save_buttons_frame.pack(pady=10)
+    # 저장 버튼 섹션
+    save_buttons_frame = tk.Frame(root)
+    save_buttons_frame.pack(pady=10)
 
-save_text_button = tk.Button(save_buttons_frame, text="추출된 텍스트 저장", command=save_text, width=20, bg="lightgreen")
-save_text_button.grid(row=0, column=0, padx=10)
+    save_text_button = tk.Button(save_buttons_frame, text="추출된 텍스트 저장", command=save_text, width=20, bg="lightgreen")
+    save_text_button.grid(row=0, column=0, padx=10)
 
-save_structured_button = tk.Button(save_buttons_frame, text="구조화된 데이터 저장", command=save_structured_data, width=20, bg="lightyellow")
-save_structured_button.grid(row=0, column=1, padx=10)
+    save_structured_button = tk.Button(save_buttons_frame, text="구조화된 데이터 저장", command=save_structured_data, width=20, bg="lightyellow")
+    save_structured_button.grid(row=0, column=1, padx=10)
 
-# Tkinter 이벤트 루프 시작
-root.mainloop()
+    # Tkinter 이벤트 루프 시작
+    root.mainloop()
@@ -1,17 +1,22 @@
-from fastapi import FastAPI, Query
-from fastapi.responses import JSONResponse, HTMLResponse
+from fastapi import FastAPI, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, HTMLResponse, Response, StreamingResponse
 from pydantic import BaseModel
-import json
 import os
 from datetime import datetime
-from typing import List, Any
+from typing import List, Any, Dict
 import uvicorn
+from sheetstore import SheetStore, VersionConflict, pick_encoding
 
 app = FastAPI()
 
 # JSON 저장 경로 설정 (절대경로)
 SAVE_PATH = r"c:\Workspace\saved_json"
 os.makedirs(SAVE_PATH, exist_ok=True)
+# 시트 파일을 gzip 으로 저장할지 (디스크는 줄지만 범위 읽기도 파일 전체를 풀어야 함)
+COMPRESS_SHEETS = False
+# 파일 I/O 는 모두 store 를 통해 스레드풀에서 (이벤트 루프를 막지 않도록)
+store = SheetStore(SAVE_PATH, compress=COMPRESS_SHEETS)
 
 # CORS 설정 (필요 시)
 from fastapi.middleware.cors import CORSMiddleware
@@ -29,6 +34,11 @@ class DataModel(BaseModel):
     headers: List[str]
     data: List[List[Any]]
 
+# 부분 저장: 불러온 판 번호 + 편집 목록 (형식은 sheetstore.check_edits 참고)
+class PatchModel(BaseModel):
+    version: int
+    edits: List[Dict[str, Any]]
+
 # HTML로 웹 페이지 제공
 @app.get("/", response_class=HTMLResponse)
 async def get_excel_page():
@@ -95,6 +105,10 @@ async def get_excel_page():
         <div id="excel"></div>
         <script>
             const container = document.getElementById('excel');
+            // 파일을 불러올 때 한 번에 가져오는 행 수
+            const PAGE_SIZE = 1000;
+            // 마지막으로 불러오거나 저장한 상태 {filename, version, headers, data} - 저장할 때 이것과 비교해 바뀐 부분만 보낸다
+            let loaded = null;
             let hot = new Handsontable(container, {
                 data: Handsontable.helper.createSpreadsheetData(5, 3),  // 초기 행과 열을 최소화
                 rowHeaders: true,
@@ -137,15 +151,18 @@ async def get_excel_page():
 
             async function fetchJsonFileList() {
                 try {
-                    const response = await fetch("/list_json");
-                    const files = await response.json();
+                    const response = await fetch("/list_json?detail=true&sort=name");
+                    const result = await response.json();
                     const select = document.getElementById('jsonFiles');
                     // 기존 옵션 제거 (초기 옵션만 남김)
                     select.innerHTML = '<option value="">-- 파일 선택 --</option>';
-                    files.forEach(file => {
+                    result.items.forEach(file => {
                         const option = document.createElement('option');
-                        option.value = file;
-                        option.text = file;
+                        option.value = file.name;
+                        // 불러오기 전에 크기를 알 수 있도록 행/열 수와 파일 크기 표시
+                        const rows = file.rows === null ? '?' : file.rows;
+                        const cols = file.cols === null ? '?' : file.cols;
+                        option.text = `${file.name} (${rows}행 × ${cols}열, ${(file.size / 1024).toFixed(1)} KB)`;
                         select.appendChild(option);
                     });
                 } catch (error) {
@@ -153,6 +170,54 @@ async def get_excel_page():
                 }
             }
             
+            function remember(filename, version, headers, data) {
+                loaded = { filename, version, headers: headers.slice(), data: data.map(row => row.slice()) };
+            }
+
+            function diffEdits(base, headers, data) {
+                // base 와 비교한 편집 목록 (열 이름 변경/끝에 열 추가 -> 셀 -> 끝의 행 추가/삭제).
+                // 열 삭제나 중간 삽입처럼 구조가 크게 바뀌었으면 null (전체 저장)
+                if (headers.length < base.headers.length || new Set(headers).size !== headers.length) {
+                    return null;
+                }
+                const edits = [];
+                const names = base.headers.slice();
+                for (let c = 0; c < headers.length; c++) {
+                    if (c < names.length && headers[c] === names[c]) {
+                        continue;
+                    }
+                    if (names.includes(headers[c])) {
+                        return null;
+                    }
+                    if (c < names.length) {
+                        edits.push({ op: 'rename_col', name: names[c], to: headers[c] });
+                        names[c] = headers[c];
+                    } else {
+                        edits.push({ op: 'insert_col', index: c, name: headers[c] });
+                        names.push(headers[c]);
+                    }
+                }
+                const common = Math.min(base.data.length, data.length);
+                for (let r = 0; r < common; r++) {
+                    for (let c = 0; c < headers.length; c++) {
+                        const old = c < base.headers.length ? base.data[r][c] : null;
+                        if (data[r][c] !== old) {
+                            edits.push({ op: 'set', row: r, col: headers[c], value: data[r][c] });
+                        }
+                    }
+                }
+                if (data.length > base.data.length) {
+                    edits.push({ op: 'insert_rows', row: base.data.length, rows: data.slice(base.data.length) });
+                } else if (data.length < base.data.length) {
+                    edits.push({ op: 'delete_rows', row: data.length, count: base.data.length - data.length });
+                }
+                // 행을 중간에 넣거나 지워서 대부분의 셀이 밀렸으면 전체 저장이 낫다
+                if (edits.length > Math.max(100, data.length * headers.length / 4)) {
+                    return null;
+                }
+                return edits;
+            }
+
             async function saveData() {
                 const colCount = hot.countCols();
                 const headers = [];
@@ -164,7 +229,30 @@ async def get_excel_page():
                 const payload = { headers, data };
                 const filenameInput = document.getElementById("filenameInput").value.trim();
                 const url = filenameInput ? `/save?filename=${encodeURIComponent(filenameInput)}` : "/save";
+                const target = filenameInput && !filenameInput.endsWith('.json') ? `${filenameInput}.json` : filenameInput;
                 try {
+                    // 파일 이름 칸에 불러온 파일 이름을 직접 적어 저장할 때만 바뀐 부분을 PATCH
+                    // (비워 두면 예전처럼 새 data_*.json 으로 저장. 정렬된 상태면 보이는 순서대로 전체 저장)
+                    const edits = loaded && target === loaded.filename && !hot.getPlugin('columnSorting').isSorted()
+                        ? diffEdits(loaded, headers, data) : null;
+                    if (edits !== null) {
+                        const response = await fetch(`/json/${encodeURIComponent(target)}`, {
+                            method: "PATCH",
+                            headers: { "Content-Type": "application/json" },
+                            body: JSON.stringify({ version: loaded.version, edits })
+                        });
+                        const result = await response.json();
+                        if (response.status === 409) {
+                            alert("다른 곳에서 먼저 저장되었습니다. 다시 불러온 뒤 저장해 주세요.");
+                            return;
+                        }
+                        if (!response.ok) {
+                            throw new Error(result.error || `HTTP ${response.status}`);
+                        }
+                        remember(target, result.version, headers, data);
+                        alert(`저장되었습니다 (${edits.length}건 변경): ${window.location.origin}${result.link}`);
+                        return;
+                    }
                     const response = await fetch(url, {
                         method: "POST",
                         headers: { "Content-Type": "application/json" },
@@ -177,6 +265,7 @@ async def get_excel_page():
                         // 새 파일을 드롭다운에 추가
                         const select = document.getElementById('jsonFiles');
                         const filename = result.link.split('/').pop();
+                        remember(filename, result.version, headers, data);
                         const option = document.createElement('option');
                         option.value = filename;
                         option.text = filename;
@@ -198,17 +287,45 @@ async def get_excel_page():
                     return;
                 }
                 try {
-                    const response = await fetch(`/json/${filename}`);
+                    // 첫 페이지를 먼저 보여 주고 나머지는 PAGE_SIZE 행씩 이어 붙인다
+                    // 열 이름은 한 번만 오는 표 형식(shape=table)으로 받는다
+                    const response = await fetch(`/json/${filename}?offset=0&limit=${PAGE_SIZE}&shape=table`);
                     if (response.ok) {
-                        const list_of_dicts = await response.json();
-                        if (list_of_dicts.length === 0) {
+                        const total = parseInt(response.headers.get('X-Total-Count') || '0', 10);
+                        const version = parseInt(response.headers.get('X-Sheet-Version'), 10);
+                        let consistent = true;
+                        const first = await response.json();
+                        if (first.rows.length === 0) {
                             alert("빈 파일입니다.");
                             return;
                         }
-                        const headers = Object.keys(list_of_dicts[0]);
-                        const data = list_of_dicts.map(obj => headers.map(header => obj[header]));
+                        const headers = first.headers;
+                        // 페이지마다 열 순서가 다를 수 있으면(예전 형식 파일) 첫 페이지 열 순서에 맞춘다
+                        const toRows = t => JSON.stringify(t.headers) === JSON.stringify(headers)
+                            ? t.rows : t.rows.map(row => headers.map(header => row[t.headers.indexOf(header)]));
                         setHeaders(headers);
-                        hot.loadData(data);
+                        hot.loadData(toRows(first));
+                        for (let offset = first.rows.length; offset < total; offset += PAGE_SIZE) {
+                            const page = await fetch(`/json/${filename}?offset=${offset}&limit=${PAGE_SIZE}&shape=table`);
+                            if (!page.ok) {
+                                throw new Error(`HTTP ${page.status}`);
+                            }
+                            // 불러오는 도중 다른 곳에서 저장됨: 다음 저장은 전체 저장으로
+                            if (parseInt(page.headers.get('X-Sheet-Version'), 10) !== version) {
+                                consistent = false;
+                            }
+                            const rows = toRows(await page.json());
+                            if (rows.length === 0) {
+                                break;
+                            }
+                            const start = hot.countRows();
+                            hot.alter('insert_row', start, rows.length);
+                            hot.populateFromArray(start, 0, rows);
+                        }
+                        loaded = null;
+                        if (consistent && !Number.isNaN(version)) {
+                            remember(filename, version, headers, hot.getData());
+                        }
                         alert("데이터를 성공적으로 불러왔습니다.");
                     } else {
                         alert("파일을 불러오는 데 실패했습니다.");
@@ -253,36 +370,129 @@ async def save_data(data_model: DataModel, filename: str = Query(None)):
         if not filename.endswith('.json'):
             filename = f"{filename}.json"
     
-    file_path = os.path.join(SAVE_PATH, filename)
-    
-    # headers와 data를 [{}, {}, {}] 형식으로 변환
-    headers = data_model.headers
-    data = data_model.data
-    list_of_dicts = [dict(zip(headers, row)) for row in data]
-    
-    # 파일 저장
-    with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(list_of_dicts, f, ensure_ascii=False, indent=2)
+    # headers와 data를 [{}, {}, {}] 형식으로 변환해 임시 파일에 쓴 뒤 교체 (같은 파일 저장은 잠금으로 순서대로)
+    version = await run_in_threadpool(store.save, filename, data_model.headers, data_model.data)
     
     # 저장된 파일 링크 생성
     file_link = f"/json/{filename}"
-    return JSONResponse(content={"link": file_link})
+    return JSONResponse(content={"link": file_link, "version": version})
+
+# 부분 저장 엔드포인트: 바뀐 셀/행/열만 받아 변경 로그에 덧붙인다 (본 파일은 백그라운드에서 합침)
+# 판 번호가 다르면 409 (그사이 다른 저장이 있었음 -> 다시 불러와야 함)
+@app.patch("/json/{filename}")
+async def patch_json(filename: str, patch: PatchModel):
+    try:
+        version = await run_in_threadpool(store.patch, filename, patch.version, patch.edits)
+    except FileNotFoundError:
+        return JSONResponse(content={"error": "파일을 찾을 수 없습니다."}, status_code=404)
+    except VersionConflict as e:
+        return JSONResponse(content={"error": "다른 곳에서 먼저 저장되었습니다.", "version": e.version}, status_code=409)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    return JSONResponse(content={"link": f"/json/{filename}", "version": version})
 
 # JSON 파일 접근용 엔드포인트
+# 직렬화한 본문을 파일별로 캐시하고, ETag/Last-Modified 로 바뀌지 않았으면 304, 가능하면 br/gzip 압축
+# offset/limit 을 주면 행 색인으로 그 범위만 읽고, format=ndjson 이면 한 줄에 한 행씩 스트리밍 (X-Total-Count: 전체 행 수)
+# 기본은 [{}, {}, {}] 형식, shape=table 이면 저장 형식 그대로 {"headers": [...], "rows": [[...], ...]}
 @app.get("/json/{filename}")
-async def get_json(filename: str):
-    file_path = os.path.join(SAVE_PATH, filename)
-    if os.path.exists(file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)  # [{}, {}, {}]
-        return JSONResponse(content=data)
+async def get_json(
+    filename: str,
+    request: Request,
+    offset: int = Query(None, ge=0),
+    limit: int = Query(None, ge=1),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+    shape: str = Query("records", pattern="^(records|table)$"),
+):
+    table = shape == "table" and format == "json"
+    if format == "ndjson" or offset is not None or limit is not None:
+        try:
+            result = await run_in_threadpool(store.read_rows, filename, offset or 0,
+                                             0 if format == "ndjson" else limit, table)
+        except ValueError as e:
+            return JSONResponse(content={"error": str(e)}, status_code=400)
+        if result is None:
+            return JSONResponse(content={"error": "파일을 찾을 수 없습니다."}, status_code=404)
+        total, rows, version = result
+        headers = {"X-Total-Count": str(total), "X-Sheet-Version": str(version)}
+        if format == "ndjson":
+            return StreamingResponse(store.iter_ndjson(filename, offset or 0, limit),
+                                     media_type="application/x-ndjson", headers=headers)
+        return JSONResponse(content=rows, headers=headers)
+
+    try:
+        entry = await run_in_threadpool(store.response, filename, table)  # [{}, {}, {}]
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    if entry is not None:
+        encoding = pick_encoding(request.headers.get("accept-encoding"), len(entry.body))
+        if entry.not_modified(request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+            return Response(status_code=304, headers=entry.headers(encoding))
+        body = await run_in_threadpool(store.encoded, entry, encoding)
+        return Response(content=body, media_type="application/json", headers=entry.headers(encoding))
     return JSONResponse(content={"error": "파일을 찾을 수 없습니다."}, status_code=404)
 
-# JSON 파일 목록 제공 엔드포인트
+# 서버 쪽 조회: eq=열=값 (같음), contains=열=글자 (포함, 대소문자 무시), sort=열 / sort=-열 (내림차순, 여러 번 가능),
+# group_by=열 (값별 개수), offset/limit 페이지. 열 색인은 파일별로 처음 쓸 때 만들고 저장하면 다시 만든다
+@app.get("/query/{filename}")
+async def query_json(
+    filename: str,
+    eq: List[str] = Query([]),
+    contains: List[str] = Query([]),
+    sort: List[str] = Query([]),
+    group_by: str = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=10000),
+    shape: str = Query("records", pattern="^(records|table)$"),
+):
+    def pairs(items):
+        result = []
+        for item in items:
+            name, sep, value = item.partition("=")
+            if not sep:
+                raise ValueError(f"'열=값' 형식이어야 합니다: {item}")
+            result.append((name, value))
+        return result
+
+    def run():
+        order = [(name[1:], True) if name.startswith("-") else (name, False) for name in sort]
+        return store.query(filename, pairs(eq), pairs(contains), order, group_by, offset, limit)
+
+    try:
+        index, result = await run_in_threadpool(run)
+    except ValueError as e:
+        return JSONResponse(content={"error": str(e)}, status_code=400)
+    if index is None:
+        return JSONResponse(content={"error": "파일을 찾을 수 없습니다."}, status_code=404)
+    content = {"total": result["total"], "offset": offset, "limit": limit, "version": index.version}
+    if group_by is not None:
+        content["groups_total"] = result["groups_total"]
+        content["groups"] = [{"value": value, "count": count} for value, count in result["groups"]]
+    else:
+        # ids: 시트에서의 행 번호 (PATCH 편집에 그대로 쓸 수 있음)
+        content["ids"] = result["ids"]
+        if shape == "table":
+            content["headers"] = index.headers
+            content["rows"] = result["rows"]
+        else:
+            content["items"] = [dict(zip(index.headers, row)) for row in result["rows"]]
+    return JSONResponse(content=content, headers={"X-Sheet-Version": str(index.version)})
+
+# JSON 파일 목록 제공 엔드포인트 (캐시된 목록에서 prefix 필터, 정렬, offset/limit 페이지)
+# detail=true 이면 파일별 크기/행 수/열 수/수정 시각과 전체 개수를 함께 돌려준다
 @app.get("/list_json")
-async def list_json_files():
-    files = [f for f in os.listdir(SAVE_PATH) if f.endswith('.json')]
-    return JSONResponse(content=files)
+async def list_json_files(
+    prefix: str = Query(None),
+    sort: str = Query("name", pattern="^(name|size|modified|rows|cols)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(None, ge=1),
+    detail: bool = Query(False),
+):
+    result = await run_in_threadpool(store.list, prefix, sort, order == "desc", offset, limit)
+    if not detail:
+        return JSONResponse(content=[item["name"] for item in result["items"]])
+    return JSONResponse(content={"total": result["total"], "offset": offset, "limit": limit, "items": result["items"]})
 
 # 실행 명령
 # 터미널에서 실행: uvicorn exceltoweb:app --reload --host 12.52.147.157 --port 7000
@@ -0,0 +1,970 @@
+import heapq
+import json
+import math
+import os
+import struct
+import threading
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from difflib import SequenceMatcher
+from itertools import chain
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 용어사전 원본 경로
+GLOSSARY_PATH = r'D:\Workspace\output.json'
+
+
+# 모든 문자열에서 '\xa0' 제거
+def clean_data(data):
+    if isinstance(data, str):
+        return data.replace('\xa0', ' ')
+    elif isinstance(data, list):
+        return [clean_data(item) for item in data]
+    elif isinstance(data, dict):
+        return {key: clean_data(value) for key, value in data.items()}
+    return data
+
+
+# 검색어 정규화: 사전과 같이 '\xa0' 를 공백으로, 맥 등에서 들어오는 NFD 한글은 NFC 로, 앞뒤 공백 제거
+def normalize_query(query):
+    return unicodedata.normalize('NFC', query.replace('\xa0', ' ')).strip()
+
+
+def file_stamp(path):
+    # 파일 변경 여부 판단용 (수정시각, 크기)
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+# 미리 컴파일한 바이너리 스냅샷 경로 (glossary_snapshot.py 로 빌드)
+def snapshot_path_for(json_path):
+    return os.path.splitext(json_path)[0] + '.glsnap'
+
+
+# 용어 단건 추가/수정/삭제 기록 (한 줄에 JSON 하나, 압축 때 원본에 합치고 비움)
+def journal_path_for(json_path):
+    return os.path.splitext(json_path)[0] + '.journal.jsonl'
+
+
+def read_journal(path):
+    # 저널 항목 목록 (파일이 없으면 빈 목록). 마지막 줄을 쓰다 멈춘 경우 온전한 줄까지만
+    entries = []
+    try:
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    break
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+class _Stage:
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    # nearest-rank 방식
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(0, min(len(sorted_values), rank) - 1)]
+
+
+class StageTimer:
+    # 검색 단계별(load, clean, index, match, score, sort, card) 소요 시간을 최근 maxlen 건씩 보관.
+    # 운영 중에도 켜 둘 수 있을 만큼 가볍게 (perf_counter 두 번 + deque.append) 측정한다.
+    def __init__(self, maxlen=10000, enabled=True):
+        self.maxlen = maxlen
+        self.enabled = enabled
+        self.samples = {}
+        self._off = _NoStage()
+
+    def stage(self, name):
+        # with stage_timer.stage("match"): ...
+        return _Stage(self, name) if self.enabled else self._off
+
+    def record(self, name, seconds):
+        samples = self.samples.get(name)
+        if samples is None:
+            samples = self.samples.setdefault(name, deque(maxlen=self.maxlen))
+        samples.append(seconds)
+
+    def summary(self):
+        # {단계: {count, mean, p50, p95, p99, max}} (밀리초)
+        result = {}
+        for name, samples in list(self.samples.items()):
+            values = sorted(samples)
+            if not values:
+                continue
+            result[name] = {
+                "count": len(values),
+                "mean": sum(values) / len(values) * 1000,
+                "p50": percentile(values, 50) * 1000,
+                "p95": percentile(values, 95) * 1000,
+                "p99": percentile(values, 99) * 1000,
+                "max": values[-1] * 1000,
+            }
+        return result
+
+    def reset(self):
+        self.samples = {}
+
+
+# 프로세스 전체에서 공유하는 단계별 타이머 (stage_timer.summary() 로 조회, enabled=False 로 끔)
+stage_timer = StageTimer()
+
+
+# 완전 일치 항목 외에 유사도 순으로 보여줄 최대 개수
+TOP_K = 15
+
+
+def calculate_similarity(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+# SequenceMatcher 는 b 길이가 200 이상이면 autojunk 휴리스틱이 켜져 결과가 달라질 수 있다
+AUTOJUNK_MIN_LEN = 200
+
+
+class TitleFeatures:
+    # 일괄 유사도 계산용으로 미리 뽑아 둔 제목 특징 (numpy 가 있으면 배열로 보관)
+    def __init__(self, titles):
+        self.titles = titles
+        lengths = [len(title) for title in titles]
+        # 소문자로 바꿔도 그대로인 제목 (한글 용어는 대부분 해당)
+        caseless = [title == title.lower() for title in titles]
+        if np is not None:
+            self.lengths = np.array(lengths, dtype=np.int64)
+            self.caseless = np.array(caseless, dtype=bool)
+        else:
+            self.lengths = lengths
+            self.caseless = caseless
+
+    def append(self, title):
+        # 배열은 여유 공간을 두배씩 늘려 가며 채운다. 제목(titles)은 마지막에 추가해서
+        # 다른 스레드가 새 번호를 볼 때는 특징 값이 이미 들어 있도록 한다.
+        idx = len(self.titles)
+        if np is not None:
+            if idx >= len(self.lengths):
+                capacity = max(16, idx * 2)
+                lengths = np.zeros(capacity, dtype=np.int64)
+                caseless = np.zeros(capacity, dtype=bool)
+                lengths[:idx] = self.lengths[:idx]
+                caseless[:idx] = self.caseless[:idx]
+                self.lengths, self.caseless = lengths, caseless
+            self.lengths[idx] = len(title)
+            self.caseless[idx] = title == title.lower()
+        else:
+            self.lengths.append(len(title))
+            self.caseless.append(title == title.lower())
+        self.titles.append(title)
+
+
+def score_batch(features, query, ids):
+    # calculate_similarity(query, titles[idx]) 와 같은 값을 후보 전체에 대해 한 번에 계산.
+    # 후보 제목은 query 를 (대소문자 무시) 포함하므로, 대소문자까지 그대로 포함하고 길이가
+    # autojunk 기준 미만이면 가장 긴 일치 블록이 query 전체가 되어 ratio = 2*lq / (lq + lt) 이다.
+    # 나머지(대소문자만 다른 경우 등)는 SequenceMatcher 로 개별 계산한다.
+    lq = len(query)
+    titles = features.titles
+    query_caseless = lq > 0 and query == query.lower()
+
+    if np is not None:
+        ids = np.asarray(ids, dtype=np.int64)
+        lt = features.lengths[ids]
+        scores = (2.0 * lq) / (lq + lt)
+        fast = lt < AUTOJUNK_MIN_LEN
+        if query_caseless:
+            fast &= features.caseless[ids]
+        else:
+            fast[:] = False
+        for pos in np.flatnonzero(~fast):
+            title = titles[ids[pos]]
+            if lq and len(title) < AUTOJUNK_MIN_LEN and query in title:
+                continue
+            scores[pos] = calculate_similarity(query, title)
+        return scores
+
+    scores = []
+    for idx in ids:
+        title = titles[idx]
+        lt = len(title)
+        if lq and lt < AUTOJUNK_MIN_LEN and query in title:
+            scores.append(2.0 * lq / (lq + lt))
+        else:
+            scores.append(calculate_similarity(query, title))
+    return scores
+
+
+def rank_batch(features, query, ids, k=TOP_K):
+    # 후보 전체를 한 번에 점수화하고 상위 k개 번호를 반환.
+    # 순서는 heapq.nlargest / sorted(..., reverse=True)[:k] 와 같다 (동점이면 앞선 후보 우선).
+    with stage_timer.stage("score"):
+        scores = score_batch(features, query, ids)
+    with stage_timer.stage("sort"):
+        return select_top(scores, ids, k)
+
+
+def select_top(scores, ids, k):
+    if np is None:
+        top = heapq.nlargest(k, range(len(scores)), key=scores.__getitem__)
+        return [ids[pos] for pos in top]
+
+    ids = np.asarray(ids, dtype=np.int64)
+    if k <= 0 or len(ids) == 0:
+        return []
+    if len(scores) > k:
+        kth = np.partition(scores, len(scores) - k)[len(scores) - k]
+        keep = np.flatnonzero(scores >= kth)
+    else:
+        keep = np.arange(len(scores))
+    order = keep[np.argsort(-scores[keep], kind='stable')][:k]
+    return ids[order].tolist()
+
+
+# 색인에 쓰는 글자 n-gram 길이 (1글자 검색어도 색인으로 찾을 수 있도록 1-gram 포함)
+NGRAM_SIZES = (1, 2, 3)
+
+
+def ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    # 소문자로 바꾼 제목의 글자 n-gram -> 항목 번호 목록(오름차순) 역색인.
+    # 한글은 음절 단위 글자이므로 한/영 혼합 용어도 같은 방식으로 색인된다.
+    # lowered 는 사전 전체 제목 목록이고, ids 를 주면 그 항목들만 색인한다 (주제별 분할용).
+    def __init__(self, lowered, ids=None):
+        self.lowered = lowered
+        self.ids = list(range(len(lowered))) if ids is None else ids
+        self.postings = {}
+        for idx in self.ids:
+            title = lowered[idx]
+            for n in NGRAM_SIZES:
+                for gram in ngrams(title, n):
+                    self.postings.setdefault(gram, []).append(idx)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, idx):
+        # 새 항목은 항상 가장 큰 번호이므로 목록 끝에 붙여도 오름차순이 유지된다
+        title = self.lowered[idx]
+        for n in NGRAM_SIZES:
+            for gram in ngrams(title, n):
+                self.postings.setdefault(gram, []).append(idx)
+        self.ids.append(idx)
+
+    def candidates(self, query):
+        # query.lower() 를 부분 문자열로 포함하는 제목의 번호를 원본 순서대로 반환
+        q = query.lower()
+        if not q:
+            return self.ids
+        n = min(len(q), NGRAM_SIZES[-1])
+        smallest = None
+        for gram in ngrams(q, n):
+            posting = self.postings.get(gram)
+            if not posting:
+                return []
+            if smallest is None or len(posting) < len(smallest):
+                smallest = posting
+        if len(q) == n:
+            # 검색어 자체가 n-gram 이면 목록이 곧 정답
+            return smallest
+        lowered = self.lowered
+        return [idx for idx in smallest if q in lowered[idx]]
+
+
+def subject_list(search_subjects):
+    # search_subjects: None / 주제 이름 하나(str) / 주제 이름 목록
+    if not search_subjects:
+        return []
+    if isinstance(search_subjects, str):
+        return [search_subjects]
+    return list(search_subjects)
+
+
+class PartitionedIndex:
+    # 주제(subject)별로 나눈 n-gram 색인. 주제를 지정한 검색은 해당 주제 색인만 조회한다.
+    # deleted 는 삭제(또는 수정 전) 항목 번호로, 다음 압축(compact) 때까지 후보에서 걸러낸다.
+    def __init__(self, lowered, partitions):
+        self.lowered = lowered
+        self.partitions = partitions
+        self.deleted = set()
+
+    def select(self, search_subjects=None):
+        # 사전에 있는 주제만 골라 사용. 지정이 없거나 아는 주제가 하나도 없으면 전체 주제 검색
+        partitions = self.partitions
+        selected = [partitions[subject] for subject in dict.fromkeys(subject_list(search_subjects))
+                    if subject in partitions]
+        return selected or list(partitions.values())
+
+    def candidates(self, query, search_subjects=None):
+        found = [ids for ids in (part.candidates(query) for part in self.select(search_subjects)) if len(ids)]
+        if not found:
+            return []
+        if len(found) == 1:
+            return self.live(found[0])
+        # 주제별 후보(각각 오름차순)를 합쳐 원래 사전 순서로
+        if np is not None:
+            return self.live(np.sort(np.concatenate([np.asarray(ids, dtype=np.int64) for ids in found])))
+        return self.live(sorted(chain.from_iterable(found)))
+
+    def live(self, ids):
+        deleted = self.deleted
+        if not deleted:
+            return ids
+        if np is not None and isinstance(ids, np.ndarray):
+            return ids[~np.isin(ids, list(deleted))]
+        return [idx for idx in ids if idx not in deleted]
+
+    def add(self, idx, subject):
+        part = self.partitions.get(subject)
+        if part is None:
+            part = NgramIndex(self.lowered, [])
+            # 검색 중인 스레드가 있어도 안전하도록 dict 는 새로 만들어 교체
+            self.partitions = {**self.partitions, subject: part}
+        part.add(idx)
+
+    def counts(self):
+        return {subject: len(self.live(part.ids)) for subject, part in self.partitions.items()}
+
+    def ids(self, subject):
+        part = self.partitions.get(subject)
+        return self.live(part.ids) if part is not None else []
+
+
+def as_text(value):
+    # 색인/스냅샷에는 문자열만 사용 (None 은 빈 문자열)
+    if value is None:
+        return ''
+    return value if isinstance(value, str) else str(value)
+
+
+def term_item(item):
+    # 단건 추가/수정할 용어 확인: title 은 빈 값이 아닌 문자열, subject 는 필수 (원본처럼 null 은 허용),
+    # content/link 는 없으면 None (원본 JSON 의 null 과 같게).
+    # 검색 결과를 만들 때 네 필드를 모두 꺼내므로 빠진 채로 저널에 쓰지 않는다
+    if not isinstance(item, dict):
+        raise ValueError("용어는 객체여야 합니다.")
+    if not isinstance(item.get("title"), str) or not item["title"].strip():
+        raise ValueError("용어에 title 이 없습니다.")
+    if "subject" not in item or not isinstance(item["subject"], (str, type(None))):
+        raise ValueError("용어에 subject 가 없습니다.")
+    item = clean_data(dict(item))
+    item.setdefault("content", None)
+    item.setdefault("link", None)
+    return item
+
+
+def entry_key(item):
+    # 용어 하나를 구분하는 키
+    return (as_text(item.get("subject")), as_text(item.get("title")))
+
+
+class GlossarySnapshot:
+    # 한 번 읽고 정리까지 끝낸 용어사전. 파일에서 다시 읽으면 새 스냅샷으로 교체되고,
+    # 용어 단건 추가/삭제(GlossaryStore.put/delete)는 이 객체에 바로 반영된다 (version 증가).
+    def __init__(self, items, stamp):
+        self.items = items
+        self.stamp = stamp
+        self.version = 0
+        titles = [as_text(item.get("title")) for item in items]
+        lowered = [title.lower() for title in titles]
+        grouped = {}
+        for idx, item in enumerate(items):
+            grouped.setdefault(as_text(item.get("subject")), []).append(idx)
+        self.index = PartitionedIndex(lowered, {subject: NgramIndex(lowered, ids) for subject, ids in grouped.items()})
+        self.features = TitleFeatures(titles)
+        self._keys = None
+
+    def candidates(self, query, search_subjects=None):
+        return self.index.candidates(query, search_subjects)
+
+    def subject_counts(self):
+        return self.index.counts()
+
+    def subject_items(self, subject, offset=0, limit=None):
+        ids = self.index.ids(subject)
+        end = len(ids) if limit is None else offset + limit
+        return [self.items[idx] for idx in ids[offset:end]]
+
+    def live_items(self):
+        deleted = self.index.deleted
+        return [item for idx, item in enumerate(self.items) if idx not in deleted]
+
+    def find(self, subject, title):
+        if self._keys is None:
+            deleted = self.index.deleted
+            self._keys = {entry_key(item): idx for idx, item in enumerate(self.items) if idx not in deleted}
+        return self._keys.get((subject, title))
+
+    def append_item(self, item):
+        # 항목 데이터를 모두 채운 뒤 마지막에 색인에 번호를 올려서, 검색 쪽은 완성된 항목만 보게 한다
+        subject, title = entry_key(item)
+        idx = len(self.items)
+        self.items.append(item)
+        self.features.append(title)
+        self.index.lowered.append(title.lower())
+        self.index.add(idx, subject)
+        if self._keys is not None:
+            self._keys[(subject, title)] = idx
+        self.version += 1
+        return idx
+
+    def remove_item(self, idx):
+        self.index.deleted.add(idx)
+        if self._keys is not None:
+            self._keys.pop(entry_key(self.items[idx]), None)
+        self.version += 1
+
+    def __len__(self):
+        return len(self.items) - len(self.index.deleted)
+
+
+def split_exact(features, query, ids):
+    # 후보를 (완전 일치, 나머지) 로 나눈다. 완전 일치는 길이가 같은 후보만 비교하면 된다.
+    titles = features.titles
+    if np is None:
+        exact = [idx for idx in ids if titles[idx] == query]
+        if not exact:
+            return [], ids
+        exact_set = set(exact)
+        return exact, [idx for idx in ids if idx not in exact_set]
+
+    ids = np.asarray(ids, dtype=np.int64)
+    same_length = ids[features.lengths[ids] == len(query)]
+    exact = [int(idx) for idx in same_length if titles[idx] == query]
+    if not exact:
+        return [], ids
+    return exact, ids[~np.isin(ids, exact)]
+
+
+# 후보 필터 -> 후보만 유사도 계산 -> 상위 k개만 선택
+# 반환: 완전 일치 항목 전부 + 유사도 상위 k개 [(subject, term, explanation, link), ...]
+# similarity=None 이면 일괄 계산(rank_batch, calculate_similarity 와 같은 difflib ratio)을 사용하고,
+# 함수를 넘기면 그 함수로 한 쌍씩 계산한다 (일괄 계산은 호출하는 쪽이 직접 골라야 한다).
+# search_subjects 를 주면 해당 주제 색인만 조회한다.
+def search(snapshot, query, k=TOP_K, similarity=None, search_subjects=None):
+    items = snapshot.items
+
+    if similarity is None:
+        with stage_timer.stage("match"):
+            ids = snapshot.candidates(query, search_subjects)
+            exact_matches, similar_ids = split_exact(snapshot.features, query, ids)
+        top = rank_batch(snapshot.features, query, similar_ids, k)
+    else:
+        with stage_timer.stage("match"):
+            exact_matches = []
+            similar_ids = []
+            for idx in snapshot.candidates(query, search_subjects):
+                if items[idx]["title"] == query:
+                    exact_matches.append(idx)
+                else:
+                    similar_ids.append(idx)
+        # nlargest 는 크기 k 힙만 유지하고, 동점이면 원래 순서를 지킨다 (sorted(..., reverse=True)[:k] 와 동일)
+        with stage_timer.stage("score"):
+            top = heapq.nlargest(k, similar_ids, key=lambda idx: similarity(query, items[idx]["title"]))
+
+    results = []
+    for idx in exact_matches + top:
+        item = items[idx]
+        results.append((item["subject"], item["title"], item["content"], item["link"]))
+    return results
+
+
+# 오타 추천: SymSpell 방식 삭제 색인 (편집거리 1 까지).
+# 정규화한 제목(소문자, 공백 제거) 앞 TYPO_PREFIX 글자에서 한 글자씩 지운 문자열을 키로 색인해 두고,
+# 검색어도 같은 방식으로 지운 키만 조회하므로 전체 사전을 훑지 않는다.
+TYPO_MAX_DISTANCE = 1
+TYPO_PREFIX = 7
+
+
+def typo_normalize(text):
+    return ''.join(text.lower().split())
+
+
+def typo_keys(text):
+    prefix = text[:TYPO_PREFIX]
+    keys = {prefix}
+    for i in range(len(prefix)):
+        keys.add(prefix[:i] + prefix[i + 1:])
+    keys.discard('')
+    return keys
+
+
+def edit_distance(a, b, limit=TYPO_MAX_DISTANCE):
+    # 인접 글자 자리바꿈을 1로 세는 편집거리 (OSA). limit 를 넘으면 limit + 1 반환
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
+
+
+class TypoIndex:
+    def __init__(self, lowered):
+        self.lowered = lowered
+        self.deletes = {}
+        self.size = 0
+        self._lock = threading.Lock()
+        self.catch_up()
+
+    def catch_up(self):
+        # 아직 색인하지 않은 항목(만드는 도중이나 이후에 추가된 용어)을 반영
+        with self._lock:
+            while self.size < len(self.lowered):
+                for key in typo_keys(typo_normalize(self.lowered[self.size])):
+                    self.deletes.setdefault(key, []).append(self.size)
+                self.size += 1
+
+    def suggest(self, query, limit=5):
+        # 편집거리 1 이내 제목 번호를 (거리, 원래 순서) 순으로 반환
+        q = typo_normalize(query)
+        if len(q) < 2:
+            return []
+        candidates = set()
+        for key in typo_keys(q):
+            candidates.update(self.deletes.get(key, ()))
+        scored = []
+        for idx in candidates:
+            distance = edit_distance(q, typo_normalize(self.lowered[idx]))
+            if distance <= TYPO_MAX_DISTANCE:
+                scored.append((distance, idx))
+        scored.sort()
+        return [idx for _, idx in scored[:limit]]
+
+
+_typo_lock = threading.Lock()
+
+
+def start_typo_index(snapshot):
+    # 스냅샷이 교체될 때 백그라운드에서 오타 색인을 미리 만들어 둔다
+    with _typo_lock:
+        if getattr(snapshot, '_typo_thread', None) is not None:
+            return
+        snapshot._typo_index = None
+
+        def build():
+            index = TypoIndex(snapshot.index.lowered)
+            snapshot._typo_index = index
+            index.catch_up()
+
+        snapshot._typo_thread = threading.Thread(target=build, name="glossary-typo-index", daemon=True)
+        snapshot._typo_thread.start()
+
+
+def suggest(snapshot, query, limit=5, wait=False, search_subjects=None):
+    # "혹시 이 단어를 찾으셨나요?" 후보 제목 목록. 색인이 아직 준비 전이면 빈 목록 (wait=True 면 기다림)
+    start_typo_index(snapshot)
+    if wait:
+        snapshot._typo_thread.join()
+    index = snapshot._typo_index
+    if index is None:
+        return []
+    subjects = None
+    if search_subjects:
+        known = [subject for subject in subject_list(search_subjects) if subject in snapshot.index.partitions]
+        subjects = set(known) or None
+    deleted = snapshot.index.deleted
+    titles = []
+    for idx in index.suggest(query, None if subjects or deleted else limit * 2):
+        if idx in deleted:
+            continue
+        if subjects is not None and as_text(snapshot.items[idx]["subject"]) not in subjects:
+            continue
+        title = snapshot.features.titles[idx]
+        if title not in titles:
+            titles.append(title)
+    return titles[:limit]
+
+
+class GlossaryStore:
+    # 용어사전을 메모리에 상주시키고, 파일이 바뀌면 새 스냅샷으로 통째로 교체한다.
+    # 검색 쪽은 snapshot() 으로 받은 객체만 쓰므로 읽는 도중 반쯤 바뀐 데이터를 볼 일이 없다.
+    # 원본과 일치하는 바이너리 스냅샷(.glsnap)이 있으면 그것을 mmap 으로 열고, 없거나 낡았으면 JSON 을 읽는다.
+    #
+    # 용어 단건 변경(put/update/delete)은 저널(.journal.jsonl)에 먼저 한 줄 추가한 뒤 메모리 색인에
+    # 그 용어만큼만 반영한다. 저널이 compact_every 줄을 넘으면 백그라운드 스레드가 원본 JSON 에 합쳐 다시 쓴다.
+    # 합치는 동안의 저널은 .compacting 으로 옮겨 두고 새 변경은 새 저널에 쌓는다 (읽을 때는 둘 다 다시 적용).
+    #
+    # 파일이 바뀌면 새 스냅샷은 백그라운드 스레드가 만들고, 그동안 검색은 기존 스냅샷으로 계속 처리한다.
+    # timer: 적재 단계(load/clean/index) 시간을 기록할 StageTimer (벤치마크 등은 따로 만든 것을 넘긴다)
+    def __init__(self, path=GLOSSARY_PATH, check_interval=1.0, compact_every=1000, timer=stage_timer):
+        self.path = path
+        self.timer = timer
+        self.snapshot_path = snapshot_path_for(path)
+        self.journal_path = journal_path_for(path)
+        self.compacting_path = self.journal_path + '.compacting'
+        self.check_interval = check_interval
+        self.compact_every = compact_every
+        self._journal_size = 0
+        self._snapshot = None
+        self._checked_at = 0.0
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        self._reload_lock = threading.Lock()
+        self._reloader = None
+
+    def current_stamp(self):
+        source_stamp = file_stamp(self.path)
+        try:
+            compiled_stamp = file_stamp(self.snapshot_path)
+        except OSError:
+            compiled_stamp = None
+        return (source_stamp, compiled_stamp)
+
+    def load(self, stamp=None):
+        if stamp is None:
+            stamp = self.current_stamp()
+        return self.replay_journal(self.load_base(stamp))
+
+    def load_base(self, stamp):
+        # 저널을 적용하기 전의 스냅샷 (.glsnap 이 맞으면 mmap, 아니면 JSON)
+        source_stamp, compiled_stamp = stamp
+        snap = None
+        if compiled_stamp is not None:
+            from glossary_snapshot import open_snapshot
+            try:
+                mapped = open_snapshot(self.snapshot_path, stamp)
+                if mapped.source_stamp == source_stamp:
+                    snap = mapped
+            except (ValueError, OSError, KeyError, TypeError, struct.error):
+                # 깨졌거나 예전 형식인 스냅샷 -> JSON 으로
+                pass
+        if snap is None:
+            snap = self.load_json(stamp)
+        return snap
+
+    def load_json(self, stamp):
+        with self.timer.stage("load"):
+            with open(self.path, 'r', encoding='utf-8') as file:
+                knowledge_list = json.load(file)
+        with self.timer.stage("clean"):
+            knowledge_list = clean_data(knowledge_list)
+        with self.timer.stage("index"):
+            return GlossarySnapshot(knowledge_list, stamp)
+
+    def replay_journal(self, snap):
+        # 아직 원본에 합치지 않은 변경 내역을 다시 적용.
+        # 합치다 멈춘 .compacting 도 먼저 적용한다 (이미 원본에 들어갔어도 같은 결과라 두 번 적용해도 됨)
+        entries = read_journal(self.compacting_path) + read_journal(self.journal_path)
+        self._journal_size = len(entries)
+        if not entries:
+            return snap
+        snap = self.writable(snap)
+        for entry in entries:
+            self.apply(snap, entry)
+        return snap
+
+    def writable(self, snap):
+        # mmap 스냅샷은 읽기 전용이므로 처음 변경할 때 한 번 메모리로 옮긴다.
+        # mmap 쪽 항목은 검색에 쓰는 필드만 담고 있어 그대로 옮기면 compact 때 원본 필드가 사라지므로
+        # 원본 JSON 을 다시 읽는다
+        if isinstance(snap, GlossarySnapshot):
+            return snap
+        return self.load_json(snap.stamp)
+
+    def snapshot(self):
+        snap = self._snapshot
+        now = time.monotonic()
+        if snap is not None and now - self._checked_at < self.check_interval:
+            return snap
+
+        try:
+            stamp = self.current_stamp()
+        except FileNotFoundError:
+            # 이미 읽어 둔 사전이 있으면 그대로 사용
+            if snap is not None:
+                return snap
+            raise
+        self._checked_at = now
+        if snap is not None and snap.stamp == stamp:
+            return snap
+        if snap is not None:
+            # 큰 사전은 다시 만드는 데 수 초 이상 걸리므로 검색은 기존 스냅샷으로 계속 처리하고 다 만들면 교체
+            self._start_reload(stamp)
+            return snap
+
+        # 처음 한 번은 읽어 둔 것이 없으므로 직접 읽는다
+        with self._lock:
+            snap = self._snapshot
+            if snap is None or snap.stamp != stamp:
+                snap = self._snapshot = self.load(stamp)
+                start_typo_index(snap)
+        return snap
+
+    def _start_reload(self, stamp):
+        with self._reload_lock:
+            if self._reloader is not None and self._reloader.is_alive():
+                return
+            self._reloader = threading.Thread(target=self._reload_in_background, args=(stamp,),
+                                              name="glossary-reload", daemon=True)
+            self._reloader.start()
+
+    def _reload_in_background(self, stamp):
+        try:
+            fresh = self.load_base(stamp)
+            if os.path.exists(self.journal_path) or os.path.exists(self.compacting_path):
+                # 저널을 적용하려면 메모리 스냅샷이 필요하므로 JSON 읽기도 잠금 밖에서 미리
+                fresh = self.writable(fresh)
+        except (ValueError, OSError):
+            # 파일을 쓰는 중이라 깨져 있을 수 있음 -> 기존 사전 유지, 다음 확인 때 재시도
+            self._checked_at = 0.0
+            return
+        with self._lock:
+            try:
+                current = self.current_stamp()
+            except OSError:
+                current = None
+            if current != stamp:
+                # 만드는 사이 파일이 또 바뀜 (또는 compact 가 먼저 교체) -> 다음 확인 때 다시
+                self._checked_at = 0.0
+                return
+            if self._snapshot is not None and self._snapshot.stamp == stamp:
+                return
+            # 저널은 잠금 안에서 적용해야 만드는 사이 들어온 단건 변경이 빠지지 않는다
+            fresh = self.replay_journal(fresh)
+            self._snapshot = fresh
+            start_typo_index(fresh)
+
+    def reload(self):
+        with self._lock:
+            self._snapshot = self.load()
+            self._checked_at = time.monotonic()
+            start_typo_index(self._snapshot)
+        return self._snapshot
+
+    @staticmethod
+    def apply(snap, entry):
+        if entry["op"] in ("put", "update"):
+            item = entry["item"]
+            if entry["op"] == "update":
+                # 수정 전 키의 항목을 지우고 새 항목으로 (키가 바뀌어도 한 줄이라 중간에 용어가 사라지지 않음)
+                old = snap.find(entry["subject"], entry["title"])
+                if old is not None:
+                    snap.remove_item(old)
+            old = snap.find(*entry_key(item))
+            if old is not None:
+                snap.remove_item(old)
+            snap.append_item(item)
+        elif entry["op"] == "delete":
+            old = snap.find(entry["subject"], entry["title"])
+            if old is not None:
+                snap.remove_item(old)
+
+    def _writable_snapshot(self):
+        with self._lock:
+            snap = self.snapshot()
+            writable = self.writable(snap)
+            if writable is not snap:
+                self._snapshot = writable
+                start_typo_index(writable)
+            return writable
+
+    def _write(self, entry):
+        with self._lock:
+            snap = self._writable_snapshot()
+            with open(self.journal_path, 'a', encoding='utf-8') as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            self._journal_size += 1
+            self.apply(snap, entry)
+            typo = getattr(snap, '_typo_index', None)
+            if typo is not None:
+                typo.catch_up()
+            if self._journal_size >= self.compact_every:
+                self._start_compact()
+
+    def put(self, item):
+        # 용어 추가 (같은 subject/title 이 있으면 교체). 필수 필드가 없으면 ValueError
+        self._write({"op": "put", "item": term_item(item)})
+
+    def update(self, subject, title, changes):
+        # 기존 용어 수정. subject/title 을 바꾸면 기존 항목은 삭제하고 새 항목으로 추가 (저널 한 줄)
+        with self._lock:
+            snap = self._writable_snapshot()
+            idx = snap.find(subject, title)
+            if idx is None:
+                raise KeyError((subject, title))
+            item = dict(snap.items[idx])
+            item.update(changes)
+            self._write({"op": "update", "subject": subject, "title": title, "item": term_item(item)})
+
+    def delete(self, subject, title):
+        self._write({"op": "delete", "subject": subject, "title": title})
+
+    def _start_compact(self):
+        # 요청을 처리하는 스레드에서는 전체 JSON 을 다시 쓰지 않는다
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self._compact_quietly, name="glossary-compact", daemon=True)
+        self._compactor.start()
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+        except (OSError, ValueError):
+            # 저널은 그대로 남아 있으므로 다음 변경 때 다시 시도
+            pass
+
+    def compact(self):
+        # 저널 내용을 원본 JSON 에 합쳐 다시 쓰고(임시 파일 -> 교체), 삭제 표시 없는 새 스냅샷으로 교체.
+        # 파일을 쓰는 동안에는 잠금을 풀어 두므로 검색과 단건 변경이 막히지 않는다
+        with self._compact_lock:
+            with self._lock:
+                items = self._writable_snapshot().live_items()
+                # 지금까지의 저널은 .compacting 으로 (이전에 합치다 멈춘 것이 있으면 뒤에 이어 붙인다)
+                if os.path.exists(self.journal_path):
+                    if os.path.exists(self.compacting_path):
+                        with open(self.journal_path, 'r', encoding='utf-8') as src, \
+                                open(self.compacting_path, 'a', encoding='utf-8') as dst:
+                            dst.write(src.read())
+                        os.remove(self.journal_path)
+                    else:
+                        os.replace(self.journal_path, self.compacting_path)
+                self._journal_size = 0
+
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as file:
+                json.dump(items, file, ensure_ascii=False, indent=2)
+                file.flush()
+                os.fsync(file.fileno())
+            fresh = GlossarySnapshot(items, None)
+
+            with self._lock:
+                os.replace(tmp_path, self.path)
+                if os.path.exists(self.compacting_path):
+                    os.remove(self.compacting_path)
+                # 쓰는 동안 들어온 변경(새 저널)을 새 스냅샷에도 적용
+                for entry in read_journal(self.journal_path):
+                    self.apply(fresh, entry)
+                fresh.stamp = self.current_stamp()
+                self._snapshot = fresh
+                self._checked_at = time.monotonic()
+                start_typo_index(fresh)
+                return fresh
+
+
+def subjects_key(search_subjects):
+    if search_subjects is None or isinstance(search_subjects, str):
+        return search_subjects
+    return tuple(sorted(search_subjects))
+
+
+class CardCache:
+    # (정규화한 검색어, search_subjects) -> 완성된 Adaptive Card 를 최근 사용 순으로 보관.
+    # 용어사전 스냅샷이 바뀌면 통째로 비운다.
+    def __init__(self, maxsize=512):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cards = OrderedDict()
+        self._snapshot = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def _check_snapshot(self, snapshot):
+        # 스냅샷이 교체됐거나 용어 단건 변경으로 version 이 바뀌면 비움
+        version = getattr(snapshot, 'version', 0)
+        if self._snapshot is not snapshot or self._version != version:
+            self._cards.clear()
+            self._snapshot = snapshot
+            self._version = version
+
+    def get(self, snapshot, query, search_subjects=None):
+        key = (query, subjects_key(search_subjects))
+        with self._lock:
+            self._check_snapshot(snapshot)
+            card = self._cards.get(key)
+            if card is None:
+                self.misses += 1
+                return None
+            self._cards.move_to_end(key)
+            self.hits += 1
+            return card
+
+    def put(self, snapshot, query, search_subjects, card):
+        key = (query, subjects_key(search_subjects))
+        with self._lock:
+            self._check_snapshot(snapshot)
+            self._cards[key] = card
+            self._cards.move_to_end(key)
+            while len(self._cards) > self.maxsize:
+                self._cards.popitem(last=False)
+        return card
+
+    def clear(self):
+        with self._lock:
+            self._cards.clear()
+            self._snapshot = None
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "size": len(self._cards),
+                "maxsize": self.maxsize,
+            }
+
+
+# 챗봇 프로세스 전체에서 공유하는 카드 캐시
+card_cache = CardCache()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+# 경로별로 하나의 저장소만 만들어 프로세스 안에서 공유
+def get_store(path=GLOSSARY_PATH):
+    store = _stores.get(path)
+    if store is None:
+        with _stores_lock:
+            store = _stores.get(path)
+            if store is None:
+                store = _stores[path] = GlossaryStore(path)
+    return store
@@ -0,0 +1,226 @@
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from glossary import GlossaryStore, StageTimer, calculate_similarity, percentile, search, stage_timer
+
+# 자주 쓰이는 한글 음절만 모아 가상 용어를 만든다 (1글자 검색어가 적당히 많이 걸리도록)
+SYLLABLES = [chr(0xAC00 + i) for i in range(0, 11172, 7)][:1200]
+WORDS = ['data', 'chip', 'wafer', 'yield', 'test', 'module', 'memory', 'dram', 'nand', 'fab',
+         'process', 'etch', 'photo', 'clean', 'mask', 'layer', 'gate', 'line', 'cell', 'lot']
+SUBJECTS = ['공정', '설비', '품질', '제품', '일반']
+# 실제 용어처럼 일부 음절은 아주 자주 나온다: 제목 절반은 이 중 하나로 시작 (앞쪽일수록 많이, 지프 분포).
+# 'broad' 검색어는 이 음절로 하므로 후보가 수천 개 이상 걸리는 경우를 잰다
+COMMON_SYLLABLES = ['반', '공', '정', '검', '설', '데', '이', '측']
+COMMON_WEIGHTS = [1 / (rank + 1) for rank in range(len(COMMON_SYLLABLES))]
+COMMON_RATE = 0.5
+CATEGORIES = ('exact', 'prefix', 'broad', 'miss')
+
+
+def make_corpus(size, seed=0):
+    # 한글 음절 + 영문 단어를 섞은 가상 용어사전 (원본처럼 '\xa0' 도 일부 포함)
+    rng = random.Random(seed)
+    items = []
+    for i in range(size):
+        syllables = ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+        if rng.random() < COMMON_RATE:
+            syllables = rng.choices(COMMON_SYLLABLES, COMMON_WEIGHTS)[0] + syllables[1:]
+        title = f"{syllables} {rng.choice(WORDS).upper()}{i}" if rng.random() < 0.5 else f"{syllables}{i}"
+        items.append({
+            "subject": rng.choice(SUBJECTS),
+            "title": title,
+            "content": f"{title}\xa0설명",
+            "link": f"https://example.com/{i}",
+        })
+    return items
+
+
+def legacy_search(items, query, k=15):
+    # 기존 logic.py 방식: 전체 항목 유사도 계산 + 필터 + 전체 정렬
+    scored_results = []
+    for item in items:
+        term = item["title"]
+        similarity = calculate_similarity(query, term)
+        if query.lower() in term.lower():
+            scored_results.append((similarity, item["subject"], term, item["content"], item["link"]))
+    exact_matches = [result for result in scored_results if result[2] == query]
+    similar_matches = [result for result in scored_results if result[2] != query]
+    similar_matches = sorted(similar_matches, key=lambda x: x[0], reverse=True)[:k]
+    return [(subject, term, explanation, link) for _, subject, term, explanation, link in exact_matches + similar_matches]
+
+
+def make_queries(items, count, seed=1):
+    # 종류별 검색어: 완전 일치 / 앞부분 / 자주 나오는 1글자(후보가 수천 개인 검색) / 없는 단어
+    rng = random.Random(seed)
+    queries = {category: [] for category in CATEGORIES}
+    for _ in range(count):
+        title = rng.choice(items)["title"]
+        queries['exact'].append(title)
+        queries['prefix'].append(title[:3])
+        queries['broad'].append(rng.choices(COMMON_SYLLABLES, COMMON_WEIGHTS)[0])
+        queries['miss'].append(title[:2] + '없는말')
+    return queries
+
+
+def mixed_queries(queries, mix, seed=2):
+    # mix: {'exact': 0.4, ...} 비율대로 섞은 검색어 목록
+    rng = random.Random(seed)
+    weights = [mix.get(category, 0) for category in CATEGORIES]
+    picked = []
+    for _ in range(len(queries['exact'])):
+        category = rng.choices(CATEGORIES, weights)[0]
+        picked.append(rng.choice(queries[category]))
+    return picked
+
+
+def build_card(results):
+    # 챗봇의 generate_adaptive_card_for_subjects 대신 쓰는 비슷한 크기의 카드
+    return {
+        "type": "AdaptiveCard",
+        "version": "1.3",
+        "body": [
+            {"type": "TextBlock", "text": f"[{subject}] {term}\n{explanation}\n{link}", "wrap": True}
+            for subject, term, explanation, link in results
+        ],
+    }
+
+
+def measure(func, queries):
+    latencies = []
+    start = time.perf_counter()
+    for query in queries:
+        t = time.perf_counter()
+        func(query)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50": percentile(latencies, 50) * 1000,
+        "p95": percentile(latencies, 95) * 1000,
+        "p99": percentile(latencies, 99) * 1000,
+        "qps": len(queries) / elapsed if elapsed else 0.0,
+    }
+
+
+class MemoryStage:
+    # 단계마다 tracemalloc 최대 메모리(단계 시작 시점 대비 증가분)를 잰다
+    def __init__(self, peaks, name):
+        self.peaks = peaks
+        self.name = name
+
+    def __enter__(self):
+        tracemalloc.reset_peak()
+        self.base = tracemalloc.get_traced_memory()[0]
+        return self
+
+    def __exit__(self, *exc):
+        peak = tracemalloc.get_traced_memory()[1] - self.base
+        self.peaks[self.name] = max(self.peaks.get(self.name, 0), peak)
+        return False
+
+
+class MemoryTimer(StageTimer):
+    # 시간 대신 단계별 최대 메모리를 peaks 에 기록하는 타이머 (GlossaryStore(timer=...) 로 넘긴다)
+    def __init__(self):
+        super().__init__()
+        self.peaks = {}
+
+    def stage(self, name):
+        return MemoryStage(self.peaks, name)
+
+
+def measure_load(items, repeat):
+    # 실제 경로와 같이 JSON 파일 -> load / clean / index 단계별 시간(repeat 번 적재한 p50/p95/p99)과 최대 메모리.
+    # tracemalloc 은 적재를 몇 배 느리게 하므로 시간과 메모리는 따로 잰다.
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'output.json')
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(items, file, ensure_ascii=False)
+        # 공용 stage_timer 는 건드리지 않고 따로 만든 타이머에 기록
+        timer = StageTimer()
+        totals = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            snapshot = GlossaryStore(path, timer=timer).load()
+            totals.append(time.perf_counter() - start)
+        stages = timer.summary()
+        totals.sort()
+        stages['total'] = {
+            "p50": percentile(totals, 50) * 1000,
+            "p95": percentile(totals, 95) * 1000,
+            "p99": percentile(totals, 99) * 1000,
+        }
+
+        memory = MemoryTimer()
+        peaks = memory.peaks
+        tracemalloc.start()
+        try:
+            GlossaryStore(path, timer=memory).load()
+            peaks['total'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    for name, stats in stages.items():
+        stats['peak_mb'] = peaks.get(name, 0) / 1024 / 1024
+    return snapshot, stages
+
+
+def run_search(snapshot, query, k):
+    results = search(snapshot, query, k=k)
+    if results:
+        with stage_timer.stage("card"):
+            build_card(results)
+    return results
+
+
+def print_table(title, rows, columns):
+    print(title)
+    print(f"  {'':<10}" + ''.join(f"{column:>10}" for column in columns))
+    for name, stats in rows:
+        print(f"  {name:<10}" + ''.join(f"{stats[column]:>10.3f}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="용어사전 검색 벤치마크 (단계별 p50/p95/p99, 처리량, 최대 메모리)")
+    parser.add_argument('--sizes', default='1000,10000,100000', help="용어 수 목록 (예: 1000,100000,1000000)")
+    parser.add_argument('--queries', type=int, default=300, help="검색어 종류별 개수")
+    parser.add_argument('--mix', default='exact=0.4,prefix=0.3,broad=0.1,miss=0.2', help="혼합 부하 비율")
+    parser.add_argument('-k', type=int, default=15)
+    parser.add_argument('--load-repeat', type=int, default=20, help="단계별 적재 시간 백분위용 반복 적재 횟수")
+    parser.add_argument('--legacy-max', type=int, default=10000, help="기존 방식과 결과 비교는 이 크기까지만")
+    args = parser.parse_args()
+    mix = {key: float(value) for key, value in (part.split('=') for part in args.mix.split(','))}
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        print(f"== 용어 {size:,}개 ==")
+        items = make_corpus(size)
+        snapshot, load_stages = measure_load(items, args.load_repeat)
+        print_table(f"  적재 단계별(ms, {args.load_repeat}회) / 최대 메모리(MB)", list(load_stages.items()),
+                    ('p50', 'p95', 'p99', 'peak_mb'))
+
+        queries = make_queries(items, args.queries)
+        if size <= args.legacy_max:
+            for category in CATEGORIES:
+                for query in queries[category][:10]:
+                    assert search(snapshot, query, k=args.k) == legacy_search(snapshot.items, query, args.k), query
+            legacy = measure(lambda q: legacy_search(snapshot.items, q, args.k), queries['exact'][:20])
+            print(f"  기존 방식(전체 스캔) p50 {legacy['p50']:.2f}ms")
+
+        rows = []
+        for category in CATEGORIES:
+            rows.append((category, measure(lambda q: run_search(snapshot, q, args.k), queries[category])))
+        stage_timer.reset()
+        rows.append(('mixed', measure(lambda q: run_search(snapshot, q, args.k), mixed_queries(queries, mix))))
+        print_table("  검색 지연(ms) / 처리량(qps)", rows, ('p50', 'p95', 'p99', 'qps'))
+        print_table("  혼합 부하 단계별(ms)", sorted(stage_timer.summary().items()), ('p50', 'p95', 'p99', 'count'))
+        broad = statistics.mean(len(snapshot.candidates(query)) for query in queries['broad'][:50])
+        print(f"  1글자 검색어 평균 후보 수: {broad:.0f}")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,317 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+from glossary import NgramIndex, GlossarySnapshot, GlossaryStore, PartitionedIndex, as_text, file_stamp, np, snapshot_path_for
+
+# 용어사전 바이너리 스냅샷 (output.json 을 미리 컴파일해 둔 파일)
+#
+#   헤더: 매직, 원본 (mtime_ns, size), 항목 수, 섹션 수
+#   섹션 목록: (이름, 시작 위치, 바이트 수, 원소 형식) - 각 섹션은 8바이트 단위로 정렬
+#   title, lower, content, link : 항목별 문자열을 이어 붙인 UTF-8
+#   <필드>_offsets : 위 문자열 안에서 각 항목의 시작 위치 (항목 수 + 1, uint64)
+#   subjects / subject_offsets : 중복 제거한 subject 문자열 / 항목별 subject 번호 (uint32)
+#   flags : 항목별 1바이트. NULLABLE 순서대로 값이 None(null) 이면 해당 비트 (문자열 섹션에는 '' 로),
+#           그 위 비트는 JSON_FIELDS 순서대로 문자열이 아닌 값 (숫자 등) 이면 1 (문자열 섹션에는 JSON 으로)
+#   partition_ids / partition_offsets : 주제 번호 순으로 묶은 항목 번호 (uint32)
+#   lengths, caseless : 일괄 유사도 계산용 제목 특징
+#   grams / gram_offsets : (주제 번호 4바이트 빅엔디언 + n-gram UTF-8) 키를 바이트 순으로 정렬
+#   posting_offsets / postings : 키별 항목 번호 목록 (uint32)
+#
+# mmap 으로 열기 때문에 여는 데 드는 시간은 파일 크기와 무관하고, 여러 워커 프로세스가 같은 페이지를 공유한다.
+
+MAGIC = b'GLSNAP03'
+HEADER = struct.Struct('<8sqqII')
+SECTION = struct.Struct('<32sQQ4s')
+FIELDS = ('title', 'lower', 'content', 'link')
+# JSON 에서 읽은 항목과 검색 결과가 같도록 None 을 따로 표시하는 필드 (비트 순서)
+NULLABLE = ('subject', 'content', 'link')
+JSON_FIELDS = ('content', 'link')
+
+
+def _le_bytes(values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def build_snapshot(json_path, snapshot_path=None):
+    snapshot_path = snapshot_path or snapshot_path_for(json_path)
+    source_stamp = file_stamp(json_path)
+    snapshot = GlossaryStore(json_path).load_json(source_stamp)
+    items = snapshot.items
+    index = snapshot.index
+
+    sections = []
+    blobs = {field: bytearray() for field in FIELDS}
+    offsets = {field: array('Q', [0]) for field in FIELDS}
+    subject_table = {subject: sid for sid, subject in enumerate(index.partitions)}
+    subject_ids = array('I')
+    flags = bytearray()
+    for idx, item in enumerate(items):
+        flag = sum(1 << bit for bit, field in enumerate(NULLABLE) if item.get(field) is None)
+        stored = {}
+        for bit, field in enumerate(JSON_FIELDS, start=len(NULLABLE)):
+            value = item.get(field)
+            if value is None or isinstance(value, str):
+                stored[field] = as_text(value)
+            else:
+                stored[field] = json.dumps(value, ensure_ascii=False)
+                flag |= 1 << bit
+        values = (snapshot.features.titles[idx], index.lowered[idx], stored["content"], stored["link"])
+        for field, value in zip(FIELDS, values):
+            blobs[field] += value.encode('utf-8')
+            offsets[field].append(len(blobs[field]))
+        subject_ids.append(subject_table[as_text(item.get("subject"))])
+        flags.append(flag)
+
+    for field in FIELDS:
+        sections.append((field, bytes(blobs[field]), 'B'))
+        sections.append((field + '_offsets', _le_bytes(offsets[field]), 'Q'))
+
+    subjects_blob = bytearray()
+    subject_offsets = array('Q', [0])
+    partition_ids = array('I')
+    partition_offsets = array('Q', [0])
+    for subject, part in index.partitions.items():
+        subjects_blob += subject.encode('utf-8')
+        subject_offsets.append(len(subjects_blob))
+        partition_ids.extend(part.ids)
+        partition_offsets.append(len(partition_ids))
+    sections.append(('subjects', bytes(subjects_blob), 'B'))
+    sections.append(('subject_offsets', _le_bytes(subject_offsets), 'Q'))
+    sections.append(('subject', _le_bytes(subject_ids), 'I'))
+    sections.append(('flags', bytes(flags), 'B'))
+    sections.append(('partition_ids', _le_bytes(partition_ids), 'I'))
+    sections.append(('partition_offsets', _le_bytes(partition_offsets), 'Q'))
+
+    lengths = array('I', (len(title) for title in snapshot.features.titles))
+    caseless = bytes(bool(flag) for flag in snapshot.features.caseless)
+    sections.append(('lengths', _le_bytes(lengths), 'I'))
+    sections.append(('caseless', caseless, 'B'))
+
+    grams_blob = bytearray()
+    gram_offsets = array('Q', [0])
+    posting_offsets = array('Q', [0])
+    postings = array('I')
+    keys = []
+    for subject, part in index.partitions.items():
+        prefix = struct.pack('>I', subject_table[subject])
+        keys.extend((prefix + gram.encode('utf-8'), part.postings[gram]) for gram in part.postings)
+    keys.sort(key=lambda entry: entry[0])
+    for key, posting in keys:
+        grams_blob += key
+        gram_offsets.append(len(grams_blob))
+        postings.extend(posting)
+        posting_offsets.append(len(postings))
+    sections.append(('grams', bytes(grams_blob), 'B'))
+    sections.append(('gram_offsets', _le_bytes(gram_offsets), 'Q'))
+    sections.append(('posting_offsets', _le_bytes(posting_offsets), 'Q'))
+    sections.append(('postings', _le_bytes(postings), 'I'))
+
+    # 헤더 + 섹션 목록 뒤에 8바이트 정렬로 섹션 배치
+    position = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, data, fmt in sections:
+        position += -position % 8
+        table.append((name, position, len(data), fmt))
+        position += len(data)
+
+    tmp_path = f"{snapshot_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, source_stamp[0], source_stamp[1], len(items), len(sections)))
+        for name, start, size, fmt in table:
+            file.write(SECTION.pack(name.encode('ascii'), start, size, fmt.encode('ascii')))
+        for (name, start, size, fmt), (_, data, _) in zip(table, sections):
+            file.write(b'\0' * (start - file.tell()))
+            file.write(data)
+    # 다 쓴 뒤 교체하므로 읽는 쪽은 이전 파일 또는 완성된 새 파일만 본다
+    # (윈도우에서는 다른 프로세스가 열고 있으면 교체가 실패할 수 있다)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path
+
+
+class _BytesColumn:
+    # 번호 -> 바이트열 (offsets 는 시작 위치 목록, 원소 수 + 1)
+    def __init__(self, blob, offsets):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, idx):
+        return bytes(self.blob[self.offsets[idx]:self.offsets[idx + 1]])
+
+
+class _StringColumn(_BytesColumn):
+    # 번호 -> 문자열 (읽을 때 UTF-8 디코딩)
+    def __getitem__(self, idx):
+        return str(self.blob[self.offsets[idx]:self.offsets[idx + 1]], 'utf-8')
+
+
+class _MappedItems:
+    # snapshot.items 대신 쓰는 읽기 전용 목록. 항목을 꺼낼 때 dict 를 만든다.
+    def __init__(self, columns, subjects, subject_ids, flags):
+        self.columns = columns
+        self.subjects = subjects
+        self.subject_ids = subject_ids
+        self.flags = flags
+
+    def __len__(self):
+        return len(self.subject_ids)
+
+    def __getitem__(self, idx):
+        columns = self.columns
+        item = {
+            "subject": self.subjects[self.subject_ids[idx]],
+            "title": columns['title'][idx],
+            "content": columns['content'][idx],
+            "link": columns['link'][idx],
+        }
+        flags = self.flags[idx]
+        if flags:
+            # JSON 에서 읽은 항목과 같은 값으로 (None, 숫자 등)
+            for bit, field in enumerate(NULLABLE):
+                if flags >> bit & 1:
+                    item[field] = None
+            for bit, field in enumerate(JSON_FIELDS, start=len(NULLABLE)):
+                if flags >> bit & 1:
+                    item[field] = json.loads(item[field])
+        return item
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+
+class _MappedPostings:
+    # 한 주제의 키 범위 [lo, hi) 안에서 n-gram 키를 이진 탐색해 항목 번호 목록(memoryview)을 돌려준다
+    def __init__(self, keys, posting_offsets, postings, sid):
+        self.keys = keys
+        self.posting_offsets = posting_offsets
+        self.postings = postings
+        self.prefix = struct.pack('>I', sid)
+        self.lo = bisect_left(keys, self.prefix)
+        self.hi = bisect_left(keys, struct.pack('>I', sid + 1), self.lo)
+
+    def __len__(self):
+        return self.hi - self.lo
+
+    def get(self, gram, default=None):
+        key = self.prefix + gram.encode('utf-8')
+        pos = bisect_left(self.keys, key, self.lo, self.hi)
+        if pos == self.hi or self.keys[pos] != key:
+            return default
+        return self.postings[self.posting_offsets[pos]:self.posting_offsets[pos + 1]]
+
+
+class _MappedIndex(NgramIndex):
+    def __init__(self, lowered, ids, postings):
+        self.lowered = lowered
+        self.ids = ids
+        self.postings = postings
+
+
+class _MappedFeatures:
+    def __init__(self, titles, lengths, caseless):
+        self.titles = titles
+        self.lengths = lengths
+        self.caseless = caseless
+
+
+class MappedSnapshot:
+    # GlossarySnapshot 과 같은 인터페이스 (items, index, features, candidates)
+    def __init__(self, path, stamp=None):
+        with open(path, 'rb') as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if len(buffer) < HEADER.size:
+            raise ValueError(f"용어사전 스냅샷이 잘렸습니다: {path}")
+        magic, mtime_ns, size, count, section_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"용어사전 스냅샷 형식이 아닙니다: {path}")
+        if len(buffer) < HEADER.size + SECTION.size * section_count:
+            raise ValueError(f"용어사전 스냅샷이 잘렸습니다: {path}")
+        self.source_stamp = (mtime_ns, size)
+        self.stamp = stamp
+        self.version = 0
+
+        sections = {}
+        layout = {}
+        for i in range(section_count):
+            name, start, length, fmt = SECTION.unpack_from(buffer, HEADER.size + SECTION.size * i)
+            name = name.rstrip(b'\0').decode('ascii')
+            fmt = fmt.rstrip(b'\0').decode('ascii')
+            # 잘린 파일이면 슬라이스가 조용히 짧아지므로 범위를 먼저 확인
+            if start + length > len(buffer):
+                raise ValueError(f"용어사전 스냅샷이 잘렸습니다: {path} ({name})")
+            view = buffer[start:start + length]
+            sections[name] = view if fmt == 'B' else view.cast(fmt)
+            layout[name] = (start, length)
+
+        if any(len(sections[field + '_offsets']) != count + 1 for field in FIELDS) \
+                or len(sections['subject']) != count or len(sections['flags']) != count:
+            raise ValueError(f"용어사전 스냅샷 항목 수가 맞지 않습니다: {path}")
+        columns = {field: _StringColumn(sections[field], sections[field + '_offsets']) for field in FIELDS}
+        subject_column = _StringColumn(sections['subjects'], sections['subject_offsets'])
+        subjects = [subject_column[i] for i in range(len(subject_column))]
+        self.items = _MappedItems(columns, subjects, sections['subject'], sections['flags'])
+
+        keys = _BytesColumn(sections['grams'], sections['gram_offsets'])
+        partition_ids = sections['partition_ids']
+        partition_offsets = sections['partition_offsets']
+        partitions = {}
+        for sid, subject in enumerate(subjects):
+            ids = partition_ids[partition_offsets[sid]:partition_offsets[sid + 1]]
+            postings = _MappedPostings(keys, sections['posting_offsets'], sections['postings'], sid)
+            partitions[subject] = _MappedIndex(columns['lower'], ids, postings)
+        self.index = PartitionedIndex(columns['lower'], partitions)
+
+        if np is not None:
+            # 복사 없이 mmap 위에 바로 numpy 배열을 얹는다
+            start, length = layout['lengths']
+            lengths = np.frombuffer(self._mmap, dtype='<u4', count=length // 4, offset=start)
+            start, length = layout['caseless']
+            caseless = np.frombuffer(self._mmap, dtype=bool, count=length, offset=start)
+            self.features = _MappedFeatures(columns['title'], lengths, caseless)
+        else:
+            self.features = _MappedFeatures(columns['title'], sections['lengths'], sections['caseless'])
+
+    candidates = GlossarySnapshot.candidates
+    subject_counts = GlossarySnapshot.subject_counts
+    subject_items = GlossarySnapshot.subject_items
+
+    def __len__(self):
+        return len(self.items)
+
+
+def open_snapshot(path, stamp=None):
+    return MappedSnapshot(path, stamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="output.json -> 용어사전 바이너리 스냅샷 빌드")
+    parser.add_argument('json_path', nargs='?', default=GlossaryStore().path)
+    parser.add_argument('-o', '--output', help="기본값: <json 이름>.glsnap")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    path = build_snapshot(args.json_path, args.output)
+    elapsed = time.perf_counter() - start
+    print(f"{path} ({os.path.getsize(path):,} bytes, {elapsed:.2f}s)")
+
+    start = time.perf_counter()
+    snapshot = open_snapshot(path)
+    print(f"열기: {(time.perf_counter() - start) * 1000:.2f}ms, 항목 {len(snapshot):,}개")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+
+# 추출 결과 캐시 (sqlite 파일 하나)
+#   키: (HTML 바이트 sha256, 태그, 클래스, 링크 여부, 이미지 여부, 파서)
+#   값: 추출 결과 목록을 JSON + zlib 으로 압축한 것
+# 전체 크기가 max_bytes 를 넘으면 가장 오래 쓰지 않은 항목부터 지운다 (LRU).
+# 쓰기는 메인 프로세스의 ExtractionCache 만 하고, 작업 프로세스는 lookup 으로 읽기만 한다.
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 이만큼 쓸 때마다 commit (작업 프로세스가 새 항목을 볼 수 있게 됨)
+COMMIT_EVERY = 200
+
+
+def cache_key(html_bytes, tag, class_name, extract_links, extract_images, parser):
+    digest = hashlib.sha256(html_bytes).hexdigest()
+    return json.dumps([digest, tag, class_name, bool(extract_links), bool(extract_images), parser], ensure_ascii=False)
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    # 읽는 쪽(작업 프로세스)이 쓰는 쪽을 막지 않도록 WAL
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def _decode(data):
+    return json.loads(zlib.decompress(data))
+
+
+class ExtractionCache:
+    def __init__(self, path, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        self._pending = 0
+        self.conn = _connect(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            "key TEXT PRIMARY KEY, data BLOB NOT NULL, size INTEGER NOT NULL, used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS records_used ON records (used)")
+        self.conn.commit()
+        self.total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM records").fetchone()[0]
+
+    def get(self, key):
+        row = self.conn.execute("SELECT data FROM records WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.touch(key)
+        return _decode(row[0])
+
+    def touch(self, key):
+        # 작업 프로세스에서 찾은 항목: 적중으로 세고 사용 시각만 갱신
+        self.hits += 1
+        self.conn.execute("UPDATE records SET used = ? WHERE key = ?", (time.time(), key))
+        self._written()
+
+    def put(self, key, records):
+        # 새로 추출한 결과 (미스로 센다)
+        self.misses += 1
+        data = zlib.compress(json.dumps(records, ensure_ascii=False).encode('utf-8'))
+        if len(data) > self.max_bytes:
+            return
+        old = self.conn.execute("SELECT size FROM records WHERE key = ?", (key,)).fetchone()
+        self.conn.execute("INSERT OR REPLACE INTO records (key, data, size, used) VALUES (?, ?, ?, ?)",
+                          (key, data, len(data), time.time()))
+        self.total += len(data) - (old[0] if old else 0)
+        if self.total > self.max_bytes:
+            self._evict()
+        self._written()
+
+    def _evict(self):
+        # 오래 안 쓴 순으로 max_bytes 아래가 될 때까지 삭제
+        victims = []
+        for key, size in self.conn.execute("SELECT key, size FROM records ORDER BY used"):
+            if self.total <= self.max_bytes:
+                break
+            victims.append((key,))
+            self.total -= size
+        self.conn.executemany("DELETE FROM records WHERE key = ?", victims)
+        self.evicted += len(victims)
+
+    def _written(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self.conn.commit()
+            self._pending = 0
+
+    def stats(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+            "entries": count,
+            "bytes": self.total,
+        }
+
+    def report(self):
+        stats = self.stats()
+        lookups = stats["hits"] + stats["misses"]
+        ratio = stats["hits"] / lookups * 100 if lookups else 0.0
+        return (f"캐시: 적중 {stats['hits']}, 미스 {stats['misses']} (적중률 {ratio:.1f}%), "
+                f"제거 {stats['evicted']}, 항목 {stats['entries']}개 / {stats['bytes'] / 1024 / 1024:.1f}MB")
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 작업 프로세스별 읽기 전용 연결 (경로 -> 연결)
+_readers = {}
+
+
+def lookup(path, key):
+    # 캐시를 못 읽으면 미스로 보고 그냥 추출한다
+    try:
+        conn = _readers.get(path)
+        if conn is None:
+            conn = _readers[path] = _connect(path)
+            conn.execute("PRAGMA query_only=1")
+        row = conn.execute("SELECT data FROM records WHERE key = ?", (key,)).fetchone()
+        return None if row is None else _decode(row[0])
+    except (sqlite3.Error, zlib.error, ValueError):
+        return None
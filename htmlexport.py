@@ -0,0 +1,184 @@
+import csv
+import json
+import os
+import sys
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+# 목록 값 필드: CSV/XLSX 에서는 "; " 로 이어 붙이고, Parquet 에서는 list<string> 으로 그대로 저장
+LIST_FIELDS = ('링크', '이미지 경로')
+INT_FIELDS = ('요소 번호',)
+
+
+def _flat(row, columns):
+    # CSV/XLSX 한 줄 (기존 save_structured_data 의 CSV 형식과 같음)
+    values = []
+    for column in columns:
+        value = row[column]
+        if column in LIST_FIELDS:
+            value = "; ".join(value) if value else ""
+        values.append(value)
+    return values
+
+
+class _TextExporter:
+    # path 가 '-' 이면 표준출력
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.count = 0
+        if path == '-':
+            self.file = sys.stdout
+        else:
+            self.file = open(path, 'w', encoding='utf-8', newline='')
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        if self.file is not sys.stdout:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JsonLinesExporter(_TextExporter):
+    def write(self, row):
+        self.file.write(json.dumps({column: row[column] for column in self.columns}, ensure_ascii=False) + '\n')
+        self.count += 1
+
+
+class JsonArrayExporter(_TextExporter):
+    # 기존 json.dump(extracted_data, indent=4) 와 같은 파일을 한 줄씩 써 나간다
+    def write(self, row):
+        text = json.dumps({column: row[column] for column in self.columns}, ensure_ascii=False, indent=4)
+        self.file.write(('[\n' if self.count == 0 else ',\n') + '    ' + text.replace('\n', '\n    '))
+        self.count += 1
+
+    def close(self):
+        self.file.write('\n]' if self.count else '[]')
+        super().close()
+
+
+class CsvExporter(_TextExporter):
+    def __init__(self, path, columns):
+        super().__init__(path, columns)
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write(self, row):
+        self.writer.writerow(_flat(row, self.columns))
+        self.count += 1
+
+
+class XlsxExporter:
+    # openpyxl write-only 모드: 행을 바로 임시 파일로 내보내므로 메모리가 행 수와 무관
+    def __init__(self, path, columns):
+        if openpyxl is None:
+            raise RuntimeError("XLSX 저장에는 openpyxl 이 필요합니다.")
+        self.path = path
+        self.columns = columns
+        self.count = 0
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet()
+        self.sheet.append(columns)
+
+    def write(self, row):
+        self.sheet.append(_flat(row, self.columns))
+        self.count += 1
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.workbook.save(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ParquetExporter:
+    # BATCH_ROWS 행씩 모아 row group 으로 쓴다. 링크/이미지 경로는 list<string> 열
+    BATCH_ROWS = 10000
+
+    def __init__(self, path, columns):
+        if pa is None:
+            raise RuntimeError("Parquet 저장에는 pyarrow 가 필요합니다.")
+        self.columns = columns
+        self.count = 0
+        fields = []
+        for column in columns:
+            if column in LIST_FIELDS:
+                fields.append(pa.field(column, pa.list_(pa.string())))
+            elif column in INT_FIELDS:
+                fields.append(pa.field(column, pa.int64()))
+            else:
+                fields.append(pa.field(column, pa.string()))
+        self.schema = pa.schema(fields)
+        self.writer = pq.ParquetWriter(path, self.schema)
+        self.batch = {column: [] for column in columns}
+
+    def write(self, row):
+        for column in self.columns:
+            self.batch[column].append(row[column])
+        self.count += 1
+        if len(self.batch[self.columns[0]]) >= self.BATCH_ROWS:
+            self.flush()
+
+    def flush(self):
+        if self.batch[self.columns[0]]:
+            self.writer.write_table(pa.table(self.batch, schema=self.schema))
+            self.batch = {column: [] for column in self.columns}
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# 확장자 -> 내보내기 클래스
+EXPORTERS = {
+    '.jsonl': JsonLinesExporter,
+    '.json': JsonArrayExporter,
+    '.csv': CsvExporter,
+    '.xlsx': XlsxExporter,
+    '.parquet': ParquetExporter,
+}
+
+
+def open_exporter(path, columns):
+    # 확장자에 맞는 exporter. '-' 는 표준출력 JSON Lines
+    if path == '-':
+        return JsonLinesExporter(path, columns)
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORTERS:
+        raise ValueError(f"지원하지 않는 형식입니다: {ext or path} (가능: {', '.join(EXPORTERS)})")
+    return EXPORTERS[ext](path, columns)
+
+
+def export_records(path, records, columns):
+    with open_exporter(path, columns) as exporter:
+        for row in records:
+            exporter.write(row)
+        return exporter.count
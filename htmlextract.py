@@ -0,0 +1,323 @@
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from bs4 import BeautifulSoup, UnicodeDammit
+from bs4.element import (CData, NavigableString, RubyParenthesisString, RubyTextString, Script, Stylesheet, Tag,
+                         TemplateString)
+
+from htmlcache import DEFAULT_MAX_BYTES, ExtractionCache, cache_key, lookup
+from htmlexport import EXPORTERS, open_exporter
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# 추출 결과 한 건의 필드 (GUI 의 extracted_data 와 같은 형식)
+FIELDS = ['요소 번호', '텍스트', '링크', '이미지 경로']
+
+# BeautifulSoup 이 get_text 에서 따로 취급하는 태그: 이 안의 문자열은 같은 태그를 추출할 때만 텍스트에 들어간다
+STRING_CONTAINERS = ('rt', 'rp', 'style', 'script', 'template')
+
+# BeautifulSoup 문자열 종류 -> 속한 STRING_CONTAINERS 태그 (None: 일반 텍스트). 없는 종류(주석 등)는 버린다
+SOUP_STRING_TYPES = {
+    NavigableString: None,
+    CData: None,
+    RubyTextString: 'rt',
+    RubyParenthesisString: 'rp',
+    Stylesheet: 'style',
+    Script: 'script',
+    TemplateString: 'template',
+}
+
+# progress/cancel 을 확인하는 간격 (요소 수)
+PROGRESS_EVERY = 1000
+
+
+class ExtractionCancelled(Exception):
+    pass
+
+
+# 트리 순회 이벤트: (START, 태그 이름, 속성) / (TEXT, 문자열, 속한 컨테이너) / (END,)
+START, TEXT, END = 0, 1, 2
+_END = (END,)
+
+
+def class_matches(value, class_name):
+    # find_all(class_=...) 과 같은 규칙: 클래스 하나가 같거나, 공백으로 나눠 다시 이은 전체 값이 같으면 일치
+    if value is None:
+        return False
+    classes = value.split() if isinstance(value, str) else value
+    return class_name in classes or ' '.join(classes) == class_name
+
+
+def collect_records(events, tag, class_name='', extract_links=False, extract_images=False, progress=None, cancel=None):
+    # 이벤트를 한 번만 훑으면서 열려 있는 일치 요소 모두에 텍스트/링크/이미지를 나눠 준다.
+    # 일치 요소가 중첩되어도(div 안의 div) 하위 트리를 다시 돌지 않는다.
+    # progress(확인한 요소 수, 일치 수) 는 PROGRESS_EVERY 요소마다 호출되고, 그때 cancel(Event) 이 켜져 있으면 중단
+    if cancel is not None and cancel.is_set():
+        raise ExtractionCancelled()
+    records = []
+    elements = 0
+    open_matches = []   # [(record, 텍스트 조각 목록), ...] 바깥 -> 안쪽
+    matched = []        # 열린 요소마다 일치 여부
+    own = tag if tag in STRING_CONTAINERS else None
+    for event in events:
+        kind = event[0]
+        if kind == TEXT:
+            if open_matches and event[2] == own:
+                text = event[1].strip()
+                if text:
+                    for _, texts in open_matches:
+                        texts.append(text)
+        elif kind == START:
+            name = event[1]
+            attrs = event[2]
+            elements += 1
+            if elements % PROGRESS_EVERY == 0:
+                if progress is not None:
+                    progress(elements, len(records))
+                if cancel is not None and cancel.is_set():
+                    raise ExtractionCancelled()
+            # 링크/이미지는 자손에서만 찾으므로 자신을 열기 전에 바깥 요소들에 붙인다
+            if open_matches:
+                if extract_links and name == 'a' and 'href' in attrs:
+                    href = attrs['href'] or ''
+                    for record, _ in open_matches:
+                        record['링크'].append(href)
+                elif extract_images and name == 'img' and 'src' in attrs:
+                    src = attrs['src'] or ''
+                    for record, _ in open_matches:
+                        record['이미지 경로'].append(src)
+            if name == tag and (not class_name or class_matches(attrs.get('class'), class_name)):
+                record = {
+                    '요소 번호': len(records) + 1,
+                    '텍스트': '',
+                    '링크': [],
+                    '이미지 경로': []
+                }
+                records.append(record)
+                open_matches.append((record, []))
+                matched.append(True)
+            else:
+                matched.append(False)
+        elif matched.pop():
+            record, texts = open_matches.pop()
+            record['텍스트'] = ' '.join(texts)
+    if progress is not None:
+        progress(elements, len(records))
+    return records
+
+
+def soup_events(soup):
+    # BeautifulSoup 트리 -> 이벤트 (깊은 문서도 되도록 재귀 없이 자식 반복자 스택으로)
+    stack = [iter(soup.contents)]
+    while stack:
+        for node in stack[-1]:
+            if isinstance(node, Tag):
+                yield START, node.name, node.attrs
+                stack.append(iter(node.contents))
+                break
+            node_type = type(node)
+            if node_type in SOUP_STRING_TYPES:
+                yield TEXT, node, SOUP_STRING_TYPES[node_type]
+        else:
+            stack.pop()
+            if stack:
+                yield _END
+
+
+def lexbor_events(tree):
+    # selectolax(lexbor) 트리 -> 이벤트. 문자열의 컨테이너는 가장 가까운 STRING_CONTAINERS 조상
+    stack = [iter(tree.root.iter(include_text=True))]
+    containers = [None]
+    root = tree.root
+    yield START, root.tag, root.attributes
+    while stack:
+        for node in stack[-1]:
+            if node.is_element_node:
+                name = node.tag
+                yield START, name, node.attributes
+                stack.append(iter(node.iter(include_text=True)))
+                containers.append(name if name in STRING_CONTAINERS else containers[-1])
+                break
+            if node.is_text_node:
+                yield TEXT, node.text_content, containers[-1]
+        else:
+            stack.pop()
+            containers.pop()
+            yield _END
+
+
+def _soup_extractor(features):
+    # BeautifulSoup + 지정한 트리 빌더
+    def extract(html_content, tag, class_name, extract_links, extract_images, progress=None, cancel=None):
+        soup = BeautifulSoup(html_content, features)
+        return collect_records(soup_events(soup), tag, class_name, extract_links, extract_images, progress, cancel)
+    return extract
+
+
+def _lexbor_extract(html_content, tag, class_name, extract_links, extract_images, progress=None, cancel=None):
+    tree = LexborHTMLParser(html_content)
+    return collect_records(lexbor_events(tree), tag, class_name, extract_links, extract_images, progress, cancel)
+
+
+# 파서 이름 -> 추출 함수. 설치된 것만 등록
+PARSERS = {'html.parser': _soup_extractor('html.parser')}
+if lxml is not None:
+    PARSERS['lxml'] = _soup_extractor('lxml')
+if LexborHTMLParser is not None:
+    PARSERS['selectolax'] = _lexbor_extract
+
+# 기본값은 기존 GUI 와 같은 html.parser. lxml / selectolax 는 빠르지만 닫히지 않은 태그처럼 깨진 HTML 은
+# 트리를 다르게 고쳐 만들어 결과가 달라질 수 있으므로 직접 골랐을 때만 쓴다
+DEFAULT_PARSER = 'html.parser'
+FAST_PARSER_NOTE = "lxml / selectolax 는 더 빠르지만 깨진 HTML 에서는 결과가 html.parser 와 다를 수 있음"
+
+
+def decode_html(data):
+    # 파일에서 읽은 바이트 -> 문자열 (BeautifulSoup 과 같은 인코딩 추정). 모든 파서가 같은 문자열을 받게 한다
+    if isinstance(data, str):
+        return data
+    return UnicodeDammit(data, is_html=True).unicode_markup
+
+
+def extract_records(html_content, tag, class_name='', extract_links=False, extract_images=False, parser=None,
+                    progress=None, cancel=None):
+    # html_content 에서 tag(+class) 요소를 찾아 텍스트/링크/이미지 경로를 뽑는다
+    parser = parser or DEFAULT_PARSER
+    if parser not in PARSERS:
+        raise ValueError(f"사용할 수 없는 파서입니다: {parser} (가능: {', '.join(PARSERS)})")
+    return PARSERS[parser](decode_html(html_content), tag, class_name, extract_links, extract_images, progress, cancel)
+
+
+def extract_file(path, tag, class_name='', extract_links=False, extract_images=False, parser=None, cache_path=None):
+    # 프로세스 풀 작업 단위: (경로, 결과 목록, 파일 크기, 오류 메시지, 캐시 키, 캐시 적중 여부)
+    # 캐시가 있으면 내용 해시로 먼저 찾아보고, 있으면 파싱하지 않는다
+    parser = parser or DEFAULT_PARSER
+    try:
+        with open(path, 'rb') as file:
+            html_content = file.read()
+        key = None
+        if cache_path:
+            key = cache_key(html_content, tag, class_name, extract_links, extract_images, parser)
+            records = lookup(cache_path, key)
+            if records is not None:
+                return path, records, len(html_content), None, key, True
+        records = extract_records(html_content, tag, class_name, extract_links, extract_images, parser)
+        return path, records, len(html_content), None, key, False
+    except Exception as e:
+        return path, [], 0, f"{type(e).__name__}: {e}", None, False
+
+
+def find_html_files(inputs):
+    # 디렉터리(하위 포함) 또는 glob 패턴 -> HTML 파일 목록
+    paths = []
+    for pattern in inputs:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                paths.extend(os.path.join(root, name) for name in sorted(files)
+                             if name.lower().endswith(('.html', '.htm')))
+        else:
+            paths.extend(sorted(glob.glob(pattern, recursive=True)))
+    return list(dict.fromkeys(paths))
+
+
+def run_batch(paths, exporter, tag, class_name='', extract_links=False, extract_images=False, workers=None, parser=None,
+              cache=None):
+    # 파일마다 끝나는 대로 결과를 exporter 에 바로 쓰고, 처리 요약을 반환
+    # cache(ExtractionCache): 작업 프로세스가 읽고, 새 결과 저장/LRU 갱신은 여기서만 한다
+    workers = workers or os.cpu_count() or 1
+    summary = {'files': 0, 'failed': [], 'elements': 0, 'bytes': 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        queue = iter(paths)
+        while True:
+            # 한 번에 너무 많은 작업을 올리지 않도록 워커 수의 4배까지만 대기
+            for path in queue:
+                pending.add(executor.submit(extract_file, path, tag, class_name, extract_links, extract_images, parser,
+                                             cache.path if cache else None))
+                if len(pending) >= workers * 4:
+                    break
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, records, size, error, key, hit = future.result()
+                summary['files'] += 1
+                if error:
+                    summary['failed'].append((path, error))
+                    continue
+                if key is not None:
+                    if hit:
+                        cache.touch(key)
+                    else:
+                        cache.put(key, records)
+                summary['bytes'] += size
+                summary['elements'] += len(records)
+                for record in records:
+                    exporter.write(dict(파일=path, **record))
+            exporter.flush()
+
+    summary['elapsed'] = time.perf_counter() - start
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTML 파일 여러 개에서 태그/클래스 요소의 텍스트·링크·이미지 경로 추출")
+    parser.add_argument('inputs', nargs='+', help="HTML 파일이 있는 디렉터리 또는 glob 패턴 (예: pages/**/*.html)")
+    parser.add_argument('-t', '--tag', required=True, help="태그 이름")
+    parser.add_argument('-c', '--class', dest='class_name', default='', help="클래스 이름 (선택)")
+    parser.add_argument('--links', action='store_true', help="a href 링크 추출")
+    parser.add_argument('--images', action='store_true', help="img src 이미지 경로 추출")
+    parser.add_argument('-o', '--output', default='-', help=f"결과 파일 ({', '.join(EXPORTERS)}, 기본: 표준출력 JSONL)")
+    parser.add_argument('-j', '--workers', type=int, default=None, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument('-p', '--parser', choices=list(PARSERS), default=DEFAULT_PARSER,
+                        help=f"HTML 파서 (기본: {DEFAULT_PARSER}). {FAST_PARSER_NOTE}")
+    parser.add_argument('--cache', help="추출 결과 캐시 파일 (sqlite). 내용이 같은 파일은 다시 파싱하지 않는다")
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024,
+                        help="캐시 최대 크기(MB), 넘으면 오래 안 쓴 것부터 삭제")
+    args = parser.parse_args(argv)
+    if args.output != '-' and os.path.splitext(args.output)[1].lower() not in EXPORTERS:
+        parser.error(f"지원하지 않는 출력 형식입니다: {args.output} (가능: {', '.join(EXPORTERS)})")
+
+    paths = find_html_files(args.inputs)
+    if not paths:
+        print("입력에 해당하는 HTML 파일이 없습니다.", file=sys.stderr)
+        return 1
+
+    cache = ExtractionCache(args.cache, int(args.cache_size * 1024 * 1024)) if args.cache else None
+    try:
+        with open_exporter(args.output, ['파일'] + FIELDS) as exporter:
+            summary = run_batch(paths, exporter, args.tag, args.class_name, args.links, args.images, args.workers,
+                                args.parser, cache)
+    finally:
+        if cache is not None:
+            cache_report = cache.report()
+            cache.close()
+
+    elapsed = summary['elapsed']
+    ok = summary['files'] - len(summary['failed'])
+    print(f"파일 {summary['files']}개 (성공 {ok}, 실패 {len(summary['failed'])}), 요소 {summary['elements']}개, "
+          f"{elapsed:.2f}초, {summary['files'] / elapsed if elapsed else 0:.1f}파일/초, "
+          f"{summary['bytes'] / 1024 / 1024 / elapsed if elapsed else 0:.2f}MB/초", file=sys.stderr)
+    if cache is not None:
+        print(cache_report, file=sys.stderr)
+    for path, error in summary['failed']:
+        print(f"  실패: {path}: {error}", file=sys.stderr)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
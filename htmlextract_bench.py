@@ -0,0 +1,108 @@
+import argparse
+import random
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from bs4 import BeautifulSoup
+
+from htmlextract import PARSERS, extract_records
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def make_page(size_mb, seed=0):
+    # 게시판/목록 페이지 비슷한 큰 HTML: 중첩 div, 링크, 이미지, 스크립트, 주석, 엔티티
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html><head><title>목록</title><style>.item{color:red}</style></head><body>']
+    size = 0
+    i = 0
+    while size < size_mb * 1024 * 1024:
+        piece = (
+            f'<div class="item{" big" if i % 7 == 0 else ""}" id="row{i}">'
+            f'<h3><a href="/post/{i}">제목 {i} &amp; 설명</a></h3>'
+            f'<div class="body"><p>본문 {rng.randint(0, 10 ** 6)}&nbsp;내용입니다 <b>강조</b></p>'
+            f'<img src="/img/{i}.png" alt="그림"><!-- 광고 {i} -->'
+            f'<div class="item meta"><span>작성자 {i % 97}</span> <a href="/user/{i % 97}">프로필</a></div></div>'
+            f'<script>var row{i} = "<b>{i}</b>";</script></div>\n'
+        )
+        parts.append(piece)
+        size += len(piece.encode('utf-8'))
+        i += 1
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def legacy_extract(html, tag, class_name):
+    # 기존 crawlingdalbong.py 방식: 일치 요소마다 get_text / find_all 로 하위 트리를 다시 훑는다
+    soup = BeautifulSoup(html, 'html.parser')
+    elements = soup.find_all(tag, class_=class_name) if class_name else soup.find_all(tag)
+    return [{
+        '요소 번호': idx,
+        '텍스트': element.get_text(separator=' ', strip=True),
+        '링크': [a['href'] for a in element.find_all('a', href=True)],
+        '이미지 경로': [img['src'] for img in element.find_all('img', src=True)]
+    } for idx, element in enumerate(elements, start=1)]
+
+
+def _run(html, parser, tag, class_name):
+    if parser == 'legacy':
+        return legacy_extract(html, tag, class_name)
+    return extract_records(html, tag, class_name, True, True, parser)
+
+
+def measure_time(html, parser, tag, class_name, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _run(html, parser, tag, class_name)
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def measure_memory(size_mb, parser, tag, class_name):
+    # 새 프로세스에서 한 번 실행해 최대 RSS 증가량을 잰다 (lxml/lexbor 의 C 메모리까지 포함).
+    # resource 가 없는 윈도우에서는 tracemalloc 으로 파이썬 힙만 잰다.
+    html = make_page(size_mb)
+    if resource is not None:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        _run(html, parser, tag, class_name)
+        after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return (after - before) / 1024, 'RSS'
+    tracemalloc.start()
+    _run(html, parser, tag, class_name)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024 / 1024, 'heap'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML 추출 파서별 벤치마크 (파싱+추출 시간, 최대 메모리)")
+    parser.add_argument('--sizes', default='1,5', help="페이지 크기 목록(MB)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('-t', '--tag', default='div')
+    parser.add_argument('-c', '--class', dest='class_name', default='item')
+    args = parser.parse_args()
+
+    for size_mb in [float(s) for s in args.sizes.split(',')]:
+        html = make_page(size_mb)
+        print(f"== {len(html.encode('utf-8')) / 1024 / 1024:.1f}MB 페이지, <{args.tag} class={args.class_name!r}> ==")
+        reference = _run(html, 'legacy', args.tag, args.class_name)
+        print(f"  {'':<12}{'min(s)':>10}{'median(s)':>11}{'MB/s':>9}{'메모리(MB)':>12}")
+        for name in ['legacy'] + list(PARSERS):
+            # 결과가 기존 방식(html.parser + find_all)과 같아야 한다
+            assert _run(html, name, args.tag, args.class_name) == reference, name
+            best, median = measure_time(html, name, args.tag, args.class_name, args.repeat)
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                memory, kind = executor.submit(measure_memory, size_mb, name, args.tag, args.class_name).result()
+            print(f"  {name:<12}{best:>10.3f}{median:>11.3f}{size_mb / best:>9.1f}{memory:>9.1f} {kind}")
+        print(f"  요소 {len(reference):,}개")
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,48 +1,33 @@
+    from glossary import card_cache, get_store, normalize_query, search, stage_timer, suggest
+    from notifier import get_notifier
     json_path = 'D:\Workspace\output.json'
     try:
-        # info.txt 파일 읽기
-        with open(json_path, 'r', encoding='utf-8') as file:
-            knowledge_list = json.load(file)
-        # 모든 문자열에서 '\xa0' 제거
-        def clean_data(data):
-            if isinstance(data, str):
-                return data.replace('\xa0', ' ')
-            elif isinstance(data, list):
-                return [clean_data(item) for item in data]
-            elif isinstance(data, dict):
-                return {key: clean_data(value) for key, value in data.items()}
-            return data            
-            
-        knowledge_list = clean_data(knowledge_list)
-        # 검색어가 포함된 term 목록 필터링
-        scored_results = []
-        for item in knowledge_list:
-            term = item["title"]
-            similarity = self.calculate_similarity(query, term)
-            if query.lower() in term.lower():
-                subject = item["subject"]
-                explanation = item["content"]
-                link = item["link"]
-                scored_results.append((similarity, subject, term, explanation, link))                    
-                    
-        # 완전 일치 항목과 유사도 기반 항목 분리
-        exact_matches = [result for result in scored_results if result[2] == query]
-        similar_matches = [result for result in scored_results if result[2] != query]
-        
-        
-        # 유사도 순으로 정렬 후 상위 10개 선택
-        similar_matches = sorted(similar_matches, key=lambda x: x[0], reverse=True)[:15]
-        
-        # 유사도 제거하고 최종 결과 구성
-        results = [(subject, term, explanation, link) for _, subject, term, explanation, link in exact_matches + similar_matches]
-       
-        if results:
-            # 검색된 term 목록을 Adaptive Card로 출력
-            self.gocwordfindresult = self.generate_adaptive_card_for_subjects(results)          
-            return self.generate_adaptive_card_for_subjects(results)
+        query = normalize_query(query)
+        # 용어사전은 메모리에 상주 ('\xa0' 정리까지 끝난 상태, 파일이 바뀌면 자동으로 다시 읽음)
+        snapshot = get_store(json_path).snapshot()
+        # 같은 검색어/주제로 이미 만든 카드가 있으면 그대로 사용 (사전이 바뀌면 캐시는 비워짐)
+        card = card_cache.get(snapshot, query, search_subjects)
+        if card is None:
+            # 검색 주제 색인에서 후보만 유사도 계산 후 완전 일치 항목 + 유사도 상위 15개
+            # 봇의 calculate_similarity 로 순위를 매긴다. 봇의 점수가 difflib ratio 그대로라고 확인되면
+            # similarity=None 으로 넘겨 일괄 계산(rank_batch)을 쓸 수 있다
+            results = search(snapshot, query, k=15, similarity=self.calculate_similarity,
+                             search_subjects=search_subjects)
+            if results:
+                # 검색된 term 목록을 Adaptive Card로 출력
+                with stage_timer.stage("card"):
+                    card = self.generate_adaptive_card_for_subjects(results)
+                card_cache.put(snapshot, query, search_subjects, card)
+
+        if card is not None:
+            self.gocwordfindresult = card
+            return card
         else:
-            chatBot.chatRequest('169006360833360896', f'조회자 [ {search_subjects} ] [ {query} ] <-- 없는 단어입니다.')           
-            chatBot.chatRequest('169658552700961792', f'[ {search_subjects} ] [ {query} ] <-- 없는 단어입니다.')
+            # 담당자 알림은 백그라운드 큐로 전송 (같은 단어는 일정 시간 안에 한 번만)
+            get_notifier(chatBot.chatRequest).notify(query, [
+                ('169006360833360896', f'조회자 [ {search_subjects} ] [ {query} ] <-- 없는 단어입니다.'),
+                ('169658552700961792', f'[ {search_subjects} ] [ {query} ] <-- 없는 단어입니다.'),
+            ])
             self.gocwordfindresult = {
     "type": "AdaptiveCard",
     "$schema": "http://adaptivecards.io/schemas/adaptive-card.json",
@@ -96,6 +81,14 @@
         }
     ]
 }
+            # 오타일 수 있으니 편집거리 1 이내 용어 추천 (미리 만든 삭제 색인 사용)
+            suggestions = suggest(snapshot, query, search_subjects=search_subjects)
+            if suggestions:
+                self.gocwordfindresult["body"].insert(1, {
+                    "type": "TextBlock",
+                    "text": "혹시 이 단어를 찾으셨나요?\n\n" + "\n\n".join(f"- {title}" for title in suggestions),
+                    "wrap": True
+                })
             return "검색 결과가 없습니다."
         
     except FileNotFoundError:
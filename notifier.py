@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class ListSink:
+    # 메신저 대신 보낸 내용을 기록만 하는 로컬 스텁 (오프라인 테스트용)
+    def __init__(self, fail_times=0):
+        self.sent = []
+        self.fail_times = fail_times
+        self._lock = threading.Lock()
+
+    def __call__(self, channel, message):
+        with self._lock:
+            if self.fail_times > 0:
+                self.fail_times -= 1
+                raise ConnectionError("stub sink failure")
+            self.sent.append((channel, message))
+
+
+class MissNotifier:
+    # "없는 단어" 알림을 검색 응답과 분리해서 백그라운드 스레드로 보낸다.
+    # - 같은 단어는 window 초 안에 한 번만 알림
+    # - batch_delay 초 동안 모인 알림은 채널별로 한 메시지로 묶어서 전송
+    # - 전송 실패는 retry_delay * 2^n 초 뒤 재시도, max_retries 회를 넘기면 버림
+    def __init__(self, sink, window=600.0, batch_delay=1.0, max_retries=3, retry_delay=2.0):
+        self.sink = sink
+        self.window = window
+        self.batch_delay = batch_delay
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.sent = 0
+        self.deduped = 0
+        self.failed = 0
+        self._seen = {}
+        # [channel, message, 시도 횟수, 전송 가능 시각]
+        self._pending = []
+        self._busy = False
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def notify(self, key, messages):
+        # messages: [(channel, message), ...]. 중복이라 건너뛰면 False
+        now = time.monotonic()
+        with self._cond:
+            last = self._seen.get(key)
+            if last is not None and now - last < self.window:
+                self.deduped += 1
+                return False
+            self._seen[key] = now
+            if len(self._seen) > 10000:
+                self._seen = {k: t for k, t in self._seen.items() if now - t < self.window}
+            for channel, message in messages:
+                self._pending.append([channel, message, 0, now + self.batch_delay])
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="miss-notifier", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout=None):
+        # 대기 중인 알림을 바로 보내고 끝날 때까지 기다림 (재시도 대기분 포함)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._busy:
+                now = time.monotonic()
+                for entry in self._pending:
+                    entry[3] = min(entry[3], now)
+                self._cond.notify_all()
+                remaining = None if deadline is None else deadline - now
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining if remaining is not None else 0.1)
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                "sent": self.sent,
+                "deduped": self.deduped,
+                "failed": self.failed,
+                "pending": len(self._pending),
+            }
+
+    def _take_due(self):
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                due = [entry for entry in self._pending if entry[3] <= now]
+                if due:
+                    self._pending = [entry for entry in self._pending if entry[3] > now]
+                    self._busy = True
+                    return due
+                timeout = min(entry[3] for entry in self._pending) - now if self._pending else None
+                self._cond.wait(timeout)
+
+    def _run(self):
+        while True:
+            due = self._take_due()
+            batches = OrderedDict()
+            for entry in due:
+                batches.setdefault(entry[0], []).append(entry)
+
+            retry = []
+            sent = failed = 0
+            for channel, entries in batches.items():
+                try:
+                    self.sink(channel, '\n'.join(entry[1] for entry in entries))
+                    sent += len(entries)
+                except Exception:
+                    now = time.monotonic()
+                    for entry in entries:
+                        entry[2] += 1
+                        if entry[2] > self.max_retries:
+                            failed += 1
+                        else:
+                            entry[3] = now + self.retry_delay * 2 ** (entry[2] - 1)
+                            retry.append(entry)
+
+            with self._cond:
+                self.sent += sent
+                self.failed += failed
+                self._pending.extend(retry)
+                self._busy = False
+                self._cond.notify_all()
+
+
+_notifier = None
+_notifier_lock = threading.Lock()
+
+
+# 프로세스 전체에서 하나의 알림 큐를 공유 (sink 는 처음 호출할 때 정해짐)
+def get_notifier(sink):
+    global _notifier
+    if _notifier is None:
+        with _notifier_lock:
+            if _notifier is None:
+                _notifier = MissNotifier(sink)
+    return _notifier
@@ -0,0 +1,211 @@
+import heapq
+import json
+import math
+import sys
+import threading
+from array import array
+
+# /query 용 시트 색인. 시트 하나(열 이름 + 행 배열)에 대해 열 색인을 처음 쓰일 때 만든다.
+#   같음(eq): 칸 글자 -> 행 번호 목록
+#   포함(contains): 서로 다른 값만 훑어서 해당 값들의 행 번호를 합친다 (대소문자 무시)
+#   정렬: 열별 순위(rank) 배열 -> 여러 열 정렬은 순위 튜플로
+#   그룹별 개수: 값 -> 행 번호 목록의 길이 (필터가 있으면 값 번호 배열로 센다)
+
+# 이 이상 정렬된 앞부분만 필요하면 전체 정렬 대신 heapq
+PARTIAL_SORT_RATIO = 8
+# 행 데이터 크기를 어림할 때 재 보는 행 수 (고르게 뽑아 전체로 늘린다)
+SIZE_SAMPLE_ROWS = 1000
+
+
+def cell_text(value):
+    # 필터 비교용 글자 (쿼리 문자열과 비교하므로 숫자 3 과 3.0 은 "3")
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float)):
+        return str(value)
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+def sort_key(value):
+    # 숫자(숫자 모양 글자 포함) < 글자 < 빈 칸
+    if value is None or value == '':
+        return (2, 0, '')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, '') if not math.isnan(value) else (2, 0, '')
+    text = cell_text(value)
+    try:
+        number = float(text)
+    except ValueError:
+        return (1, 0, text)
+    if math.isnan(number) or math.isinf(number):
+        return (1, 0, text)
+    return (0, number, '')
+
+
+def rows_size(rows):
+    # 행 목록의 어림 크기 (바이트). 행이 많으면 SIZE_SAMPLE_ROWS 개만 재서 늘린다
+    if not rows:
+        return sys.getsizeof(rows)
+    step = max(1, len(rows) // SIZE_SAMPLE_ROWS)
+    sample = rows[::step]
+    sampled = sum(sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row) for row in sample)
+    return sys.getsizeof(rows) + sampled * len(rows) // len(sample)
+
+
+class ColumnIndex:
+    def __init__(self, values):
+        self.groups = {}
+        self.samples = {}
+        codes = array('I')
+        numbers = {}
+        for row_id, value in enumerate(values):
+            text = cell_text(value)
+            code = numbers.get(text)
+            if code is None:
+                code = numbers[text] = len(numbers)
+                self.groups[text] = array('I')
+                self.samples[text] = value
+            self.groups[text].append(row_id)
+            codes.append(code)
+        # 값 번호: 행 -> 서로 다른 값 중 몇 번째
+        self.codes = codes
+        self.texts = list(numbers)
+        self.folded = [text.casefold() for text in self.texts]
+        self._ranks = {}
+        self._orders = {}
+        # 어림 크기 (바이트): 값 번호 + 그룹별 행 번호 배열 + 서로 다른 값 글자 (원래/소문자) + 사전
+        self._size = (codes.itemsize * len(codes) * 2 + sys.getsizeof(array('I')) * len(numbers)
+                      + sum(sys.getsizeof(text) for text in self.texts) * 2 + sys.getsizeof(numbers) * 3)
+
+    def rank(self, descending=False):
+        # 행 -> 정렬 순위 (같은 값이면 같은 순위, 작은 것이 앞). 빈 칸은 내림차순에서도 맨 뒤
+        rank = self._ranks.get(descending)
+        if rank is None:
+            keys = [sort_key(self.samples[text]) for text in self.texts]
+            ranks = [0] * len(keys)
+            previous = None
+            value = -1
+            for code in sorted(range(len(keys)), key=keys.__getitem__):
+                if keys[code] != previous:
+                    value += 1
+                    previous = keys[code]
+                ranks[code] = value
+            if descending:
+                ranks = [1 if keys[code][0] == 2 else -value for code, value in enumerate(ranks)]
+            rank = self._ranks[descending] = array('i', [ranks[code] for code in self.codes])
+        return rank
+
+    def order(self, descending):
+        # 전체 행을 이 열로 정렬한 행 번호 (같은 값은 원래 순서)
+        order = self._orders.get(descending)
+        if order is None:
+            rank = self.rank(descending)
+            order = self._orders[descending] = array('I', sorted(range(len(rank)), key=rank.__getitem__))
+        return order
+
+    def size(self):
+        # 정렬용 순위/순서 배열은 행마다 4바이트씩 늘어난다
+        return self._size + 4 * len(self.codes) * (len(self._ranks) + len(self._orders))
+
+    def equal(self, text):
+        return self.groups.get(text, ())
+
+    def contains(self, needle):
+        needle = needle.casefold()
+        found = set()
+        for text, folded in zip(self.texts, self.folded):
+            if needle in folded:
+                found.update(self.groups[text])
+        return found
+
+
+class SheetIndex:
+    # stamp/version: 색인을 만든 시트 상태 (SheetStore 가 바뀌었는지 확인하는 데 씀)
+    def __init__(self, stamp, version, headers, rows):
+        self.stamp = stamp
+        self.version = version
+        self.headers = headers
+        self.rows = rows
+        # 이름이 같은 열이 여럿이면 [{}, {}, {}] 로 바꿀 때처럼 마지막 열
+        self.positions = {name: position for position, name in enumerate(headers)}
+        self._columns = {}
+        self._lock = threading.Lock()
+        self._rows_size = rows_size(rows)
+
+    def size(self):
+        # 어림 크기 (바이트): 행 데이터 + 지금까지 만든 열 색인 (SheetStore 캐시 크기 계산용)
+        return self._rows_size + sum(column.size() for column in list(self._columns.values()))
+
+    def column(self, name):
+        position = self.positions.get(name)
+        if position is None:
+            raise ValueError(f"없는 열입니다: {name}")
+        with self._lock:
+            index = self._columns.get(name)
+            if index is None:
+                values = [row[position] if position < len(row) else None for row in self.rows]
+                index = self._columns[name] = ColumnIndex(values)
+            return index
+
+    def match(self, equals=(), contains=()):
+        # 조건에 맞는 행 번호 (행 순서). 조건이 없으면 None (= 전체)
+        found = None
+        for name, text in equals:
+            ids = self.column(name).equal(text)
+            found = set(ids) if found is None else found.intersection(ids)
+        for name, needle in contains:
+            ids = self.column(name).contains(needle)
+            found = ids if found is None else found & ids
+        return None if found is None else sorted(found)
+
+    def sorted_ids(self, ids, sort, offset, limit):
+        # ids(None 이면 전체)를 sort [(열, 내림차순 여부), ...] 로 정렬한 것 중 [offset, offset+limit)
+        end = None if limit is None else offset + limit
+        if not sort:
+            ids = range(len(self.rows)) if ids is None else ids
+            return list(ids[offset:end])
+        if ids is None and len(sort) == 1:
+            name, descending = sort[0]
+            return list(self.column(name).order(descending)[offset:end])
+        ranks = [self.column(name).rank(descending) for name, descending in sort]
+        if len(ranks) == 1:
+            key = ranks[0].__getitem__
+        else:
+            def key(row_id):
+                return tuple(rank[row_id] for rank in ranks)
+        ids = range(len(self.rows)) if ids is None else ids
+        if end is not None and end * PARTIAL_SORT_RATIO < len(ids):
+            # nsmallest 도 같은 값은 원래 순서를 지킨다
+            return heapq.nsmallest(end, ids, key=key)[offset:]
+        return sorted(ids, key=key)[offset:end]
+
+    def group_counts(self, name, ids):
+        # [(값, 개수), ...] 개수 많은 순 (같으면 값 순서)
+        column = self.column(name)
+        if ids is None:
+            counts = [(text, len(row_ids)) for text, row_ids in column.groups.items()]
+        else:
+            tally = [0] * len(column.texts)
+            for row_id in ids:
+                tally[column.codes[row_id]] += 1
+            counts = [(text, count) for text, count in zip(column.texts, tally) if count]
+        counts.sort(key=lambda item: (-item[1], sort_key(column.samples[item[0]])))
+        return [(column.samples[text], count) for text, count in counts]
+
+    def query(self, equals=(), contains=(), sort=(), group_by=None, offset=0, limit=None):
+        # {'total': 맞는 행 수, 'ids': 이번 페이지 행 번호, 'rows': 그 행들} 또는 group_by 면
+        # {'total': 맞는 행 수, 'groups_total': 그룹 수, 'groups': [(값, 개수), ...] 이번 페이지}
+        ids = self.match(equals, contains)
+        total = len(self.rows) if ids is None else len(ids)
+        if group_by is not None:
+            groups = self.group_counts(group_by, ids)
+            end = None if limit is None else offset + limit
+            return {'total': total, 'groups_total': len(groups), 'groups': groups[offset:end]}
+        page = self.sorted_ids(ids, sort, offset, limit)
+        return {'total': total, 'ids': page, 'rows': [self.rows[row_id] for row_id in page]}
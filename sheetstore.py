@@ -0,0 +1,1013 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import queue
+import re
+import tempfile
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from sheetquery import SheetIndex
+
+# 응답 본문이 이보다 작으면 압축하지 않는다
+COMPRESS_MIN_BYTES = 1024
+# 폴더 mtime 이 그대로여도 이 간격(초)마다 한 번은 다시 훑는다 (파일을 그 자리에서 고친 경우)
+CATALOG_RESCAN = 30.0
+CATALOG_SORT_KEYS = ('name', 'size', 'modified', 'rows', 'cols')
+# 행 번호 색인을 캐시해 둘 파일 수, 스트리밍 때 한 번에 읽는 행 수
+ROW_INDEX_FILES = 64
+ROW_BATCH = 500
+# /query 열 색인을 캐시해 둘 최대 파일 수 (크기는 응답 캐시와 함께 cache_bytes 안에서)
+QUERY_INDEX_FILES = 16
+# 부분 저장(PATCH): 마지막 편집 후 이만큼(초) 조용하거나 로그가 이만큼 쌓이면 본 파일에 합친다
+COMPACT_DELAY = 5.0
+COMPACT_EDITS = 200
+
+# 저장 형식: 열 이름은 한 번만, 행은 배열로 한 줄에 하나씩 (행 색인은 줄 단위로 찾는다)
+#   {"format":"sheet/1","headers":["a","b"],"rows":[
+#   [1,"x"],
+#   [2,"y"]
+#   ]}
+# compress 로 저장하면 같은 내용을 gzip 으로 (디스크는 줄지만 행 색인 없이 통째로 읽는다)
+SHEET_FORMAT = "sheet/1"
+_SHEET_PREFIX = b'{"format":"sheet/1",'
+_GZIP_MAGIC = b'\x1f\x8b'
+
+# orjson 은 64비트를 넘는 정수를 말없이 실수로 읽으므로, 숫자가 이만큼 이어진 곳이 있으면 표준 json 으로 읽는다
+# (숫자를 모두 0 으로 바꾼 뒤 0 이 20개 이어진 곳을 찾는다. 문자열 안의 숫자여도 표준 json 으로 읽을 뿐 결과는 같음)
+_DIGITS_TO_ZERO = bytes.maketrans(b'123456789', b'000000000')
+_LONG_NUMBER = b'0' * 20
+
+# 최상위 배열 안 행의 시작/끝을 찾을 때 보는 토큰: 문자열(통째로 건너뜀), 여는 괄호, 닫는 괄호
+_TOKEN = re.compile(rb'(?P<s>"(?:[^"\\]|\\.)*")|(?P<o>[\[{])|(?P<c>[\]}])', re.S)
+
+
+def atomic_write(path, data):
+    # 같은 폴더의 임시 파일에 다 쓴 뒤 교체 -> 읽는 쪽은 이전 파일 또는 완성된 새 파일만 본다
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # 윈도우에서는 다른 쪽이 파일을 열고 있으면 교체가 잠깐 실패할 수 있어 몇 번 다시 시도
+        for attempt in range(5):
+            try:
+                os.replace(tmp_path, path)
+                break
+            except PermissionError:
+                if attempt == 4:
+                    raise
+                time.sleep(0.05 * (attempt + 1))
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def dumps(obj):
+    # 공백 없는 UTF-8 JSON bytes (orjson 이 있으면 그쪽으로, 못 다루는 값이면 표준 json)
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return std_dumps(obj)
+
+
+def loads(data):
+    # orjson 이 있으면 그쪽으로. 못 읽거나(NaN, Infinity 등) 큰 정수가 있으면 표준 json (값이 바뀌지 않게)
+    if orjson is not None and data.translate(_DIGITS_TO_ZERO).find(_LONG_NUMBER) == -1:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(data)
+
+
+def std_dumps(obj):
+    # 표준 json 으로 직렬화 (NaN 도 그대로 남긴다. orjson 은 null 로 바꿈)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def encode_sheet(headers, rows, compress=False):
+    # 저장 형식으로 직렬화 (위 SHEET_FORMAT 설명 참고)
+    parts = [_SHEET_PREFIX + b'"headers":' + dumps(headers) + b',"rows":[\n']
+    parts.append(b',\n'.join(dumps(row) for row in rows))
+    parts.append(b'\n]}' if rows else b']}')
+    payload = b''.join(parts)
+    return gzip.compress(payload, compresslevel=6) if compress else payload
+
+
+def decode_sheet(raw):
+    # 파일 내용 -> (headers, rows). 새 형식이면 rows 는 배열 목록,
+    # 예전 형식([{}, {}, ...] 등)이면 headers 는 None 이고 rows 는 JSON 그대로
+    if raw[:2] == _GZIP_MAGIC:
+        raw = gzip.decompress(raw)
+    data = loads(raw)
+    if isinstance(data, dict) and data.get("format") == SHEET_FORMAT:
+        return data["headers"], data["rows"]
+    return None, data
+
+
+def to_records(headers, rows):
+    # [{}, {}, {}] 형식으로 (예전 형식은 그대로)
+    if headers is None:
+        return rows
+    return [dict(zip(headers, row)) for row in rows]
+
+
+def to_table(headers, rows):
+    # (열 이름, 행 배열 목록)으로. 예전 형식은 모든 행의 키를 나온 순서대로 열로 (없는 칸은 None)
+    if headers is not None:
+        return headers, rows
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        raise ValueError("표 형식(행 객체 배열)이 아닙니다.")
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    return columns, [[row.get(column) for column in columns] for row in rows]
+
+
+def uniform_columns(rows):
+    # 예전 형식에서 모든 행이 같은 키를 같은 순서로 가지면 그 키 목록 (새 형식으로 바꿔도 그대로 되돌릴 수 있음), 아니면 None
+    if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+        return None
+    columns = list(rows[0]) if rows else []
+    if any(list(row) != columns for row in rows):
+        return None
+    return columns
+
+
+def shape_rows(headers, rows, table):
+    # 응답 모양: table 이면 {"headers": [...], "rows": [[...], ...]}, 아니면 [{}, {}, {}]
+    if table:
+        headers, rows = to_table(headers, rows)
+        return {"headers": headers, "rows": rows}
+    return to_records(headers, rows)
+
+
+class CachedResponse:
+    # /json/{filename} 응답 한 벌: 직렬화한 본문 + ETag/Last-Modified + 압축본(요청이 올 때 한 번만 만든다)
+    def __init__(self, stamp, body):
+        self.stamp = stamp
+        self.body = body
+        self.etag = '"%s"' % hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.last_modified = formatdate(stamp[0] / 1e9, usegmt=True)
+        self._encoded = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding):
+        # encoding: None / 'gzip' / 'br'
+        if encoding is None:
+            return self.body
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                if encoding == 'br':
+                    data = brotli.compress(self.body, quality=5)
+                else:
+                    data = gzip.compress(self.body, compresslevel=6)
+                self._encoded[encoding] = data
+            return data
+
+    def etag_for(self, encoding):
+        # 압축본은 다른 표현이므로 ETag 도 구분
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    def size(self):
+        return len(self.body) + sum(len(data) for data in self._encoded.values())
+
+    def headers(self, encoding):
+        headers = {
+            "ETag": self.etag_for(encoding),
+            "Last-Modified": self.last_modified,
+            # 브라우저가 매번 재검증 -> 바뀌지 않았으면 304
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+            # 부분 저장(PATCH) 때 돌려보낼 판 번호
+            "X-Sheet-Version": str(self.stamp[2]),
+        }
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return headers
+
+    def not_modified(self, if_none_match, if_modified_since):
+        # 조건부 요청 판단 (If-None-Match 가 있으면 If-Modified-Since 는 보지 않는다)
+        if if_none_match:
+            if if_none_match.strip() == '*':
+                return True
+            tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+            return any(self.etag_for(encoding) in tags for encoding in (None, 'gzip', 'br'))
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.stamp[0] // 1_000_000_000) <= since
+        return False
+
+
+def pick_encoding(accept_encoding, size):
+    # Accept-Encoding 에서 br > gzip 순으로 고른다 (q=0 은 거부)
+    if size < COMPRESS_MIN_BYTES or not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.lower().split(','):
+        name, _, params = part.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(name.strip())
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted:
+        return 'gzip'
+    return None
+
+
+def sheet_shape(headers, rows):
+    # (행 수, 열 수) - 화면은 첫 행의 키를 열로 쓴다 (headers, rows 는 decode_sheet 참고)
+    if not isinstance(rows, list):
+        # 배열이 아닌 파일은 행 하나로 본다 (read_rows 와 같게)
+        rows = [rows]
+    if not rows:
+        return 0, 0
+    if headers is not None:
+        return len(rows), len(dict(zip(headers, rows[0])))
+    return len(rows), len(rows[0]) if isinstance(rows[0], dict) else 0
+
+
+class RowIndex:
+    # 파일에서 각 행의 바이트 범위 [starts[i], ends[i]). headers: 새 형식이면 열 이름 (행이 배열), 예전 형식이면 None
+    def __init__(self, stamp, starts, ends, headers=None):
+        self.stamp = stamp
+        self.starts = starts
+        self.ends = ends
+        self.headers = headers
+
+    def __len__(self):
+        return len(self.starts)
+
+
+def _sheet_row_index(mm, stamp):
+    # 새 형식: 첫 줄(열 이름)과 마지막 줄(]}) 사이의 한 줄이 한 행
+    first_end = mm.find(b'\n')
+    if first_end == -1:
+        return None
+    headers = loads(mm[:first_end] + b']}')["headers"]
+    starts = array('Q')
+    ends = array('Q')
+    pos = first_end + 1
+    while True:
+        end = mm.find(b'\n', pos)
+        if end == -1:
+            break
+        starts.append(pos)
+        ends.append(end - 1 if mm[end - 1] == ord(',') else end)
+        pos = end + 1
+    return RowIndex(stamp, starts, ends, headers)
+
+
+def build_row_index(path):
+    # 파일을 mmap 으로 한 번 훑어 행 범위를 찾는다 (파일 전체를 파싱하지 않음).
+    # 압축했거나 최상위가 객체/배열을 담은 배열이 아니면 None
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        stamp = (st.st_mtime_ns, st.st_size)
+        if st.st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(_SHEET_PREFIX)] == _SHEET_PREFIX:
+                return _sheet_row_index(mm, stamp)
+            starts = array('Q')
+            ends = array('Q')
+            depth = 0
+            first = True
+            for m in _TOKEN.finditer(mm):
+                kind = m.lastgroup
+                if first:
+                    if kind != 'o' or mm[m.start()] != ord('['):
+                        return None
+                    first = False
+                if kind == 'o':
+                    depth += 1
+                    if depth == 2:
+                        starts.append(m.start())
+                elif kind == 'c':
+                    depth -= 1
+                    if depth == 1:
+                        ends.append(m.end())
+                    elif depth == 0:
+                        break
+                elif depth == 1:
+                    # 최상위 배열에 문자열이 바로 들어 있음
+                    return None
+            if depth != 0 or first:
+                return None
+    return RowIndex(stamp, starts, ends)
+
+
+class VersionConflict(Exception):
+    # 편집을 보낸 쪽이 가진 판이 현재 판과 다름 (그사이 다른 저장이 있었음)
+    def __init__(self, version):
+        super().__init__(f"현재 판은 {version} 입니다.")
+        self.version = version
+
+
+def _is_index(value, low, high):
+    return type(value) is int and low <= value <= high
+
+
+def check_edits(columns, count, edits):
+    # 편집 목록을 적용하기 전에 끝까지 검사한다 (하나라도 잘못되면 하나도 적용하지 않도록). 잘못되면 ValueError
+    #   {"op": "set", "row": 행, "col": 열 이름, "value": 값}
+    #   {"op": "insert_rows", "row": 위치, "rows": [[값, ...] 또는 {열: 값}, ...]}
+    #   {"op": "delete_rows", "row": 위치, "count": 개수}
+    #   {"op": "insert_col", "index": 위치, "name": 열 이름}
+    #   {"op": "delete_col", "name": 열 이름}
+    #   {"op": "rename_col", "name": 열 이름, "to": 새 이름}
+    columns = list(columns)
+    for number, edit in enumerate(edits, start=1):
+        op = edit.get('op') if isinstance(edit, dict) else None
+        if op == 'set':
+            ok = _is_index(edit.get('row'), 0, count - 1) and edit.get('col') in columns and 'value' in edit
+        elif op == 'insert_rows':
+            rows = edit.get('rows')
+            ok = (_is_index(edit.get('row'), 0, count) and isinstance(rows, list)
+                  and all(isinstance(row, dict) or (isinstance(row, list) and len(row) <= len(columns)) for row in rows))
+            if ok:
+                count += len(rows)
+        elif op == 'delete_rows':
+            ok = _is_index(edit.get('count'), 1, count) and _is_index(edit.get('row'), 0, count - edit['count'])
+            if ok:
+                count -= edit['count']
+        elif op == 'insert_col':
+            name = edit.get('name')
+            ok = _is_index(edit.get('index'), 0, len(columns)) and isinstance(name, str) and name not in columns
+            if ok:
+                columns.insert(edit['index'], name)
+        elif op == 'delete_col':
+            ok = edit.get('name') in columns
+            if ok:
+                columns.remove(edit['name'])
+        elif op == 'rename_col':
+            to = edit.get('to')
+            ok = edit.get('name') in columns and isinstance(to, str) and to not in columns
+            if ok:
+                columns[columns.index(edit['name'])] = to
+        else:
+            raise ValueError(f"{number}번째 편집: 알 수 없는 op 입니다: {op!r}")
+        if not ok:
+            raise ValueError(f"{number}번째 편집({op})이 현재 시트와 맞지 않습니다.")
+
+
+def apply_edits(columns, rows, edits):
+    # check_edits 를 통과한 편집을 columns(열 순서)/rows(행 dict 목록)에 그대로 적용
+    for edit in edits:
+        op = edit['op']
+        if op == 'set':
+            rows[edit['row']][edit['col']] = edit['value']
+        elif op == 'insert_rows':
+            new_rows = [dict(row) if isinstance(row, dict) else dict(zip(columns, row)) for row in edit['rows']]
+            rows[edit['row']:edit['row']] = new_rows
+        elif op == 'delete_rows':
+            del rows[edit['row']:edit['row'] + edit['count']]
+        elif op == 'insert_col':
+            columns.insert(edit['index'], edit['name'])
+            for row in rows:
+                row[edit['name']] = None
+        elif op == 'delete_col':
+            columns.remove(edit['name'])
+            for row in rows:
+                row.pop(edit['name'], None)
+        elif op == 'rename_col':
+            name, to = edit['name'], edit['to']
+            columns[columns.index(name)] = to
+            for row in rows:
+                if name in row:
+                    row[to] = row.pop(name)
+
+
+class LiveSheet:
+    # 시트 하나의 편집 상태.
+    #   version: 판 번호 (저장/편집할 때마다 1 증가), stamp: 본 파일 (mtime_ns, size)
+    #   log: 변경 로그에는 있지만 아직 본 파일에 합치지 않은 편집 묶음
+    #   columns/rows: log 가 있는 동안의 메모리 사본 (본 파일 + log). 합치고 나면 버린다
+    #   checked: 예전 형식 파일인지 확인해 (필요하면) 새 형식으로 바꿔 썼는지
+    def __init__(self, stamp, version, log, logged):
+        self.stamp = stamp
+        self.version = version
+        self.log = log
+        self.logged = logged
+        self.checked = False
+        self.columns = None
+        self.rows = None
+        self.modified_ns = stamp[0]
+        self.touched = 0.0
+        self.queued = False
+
+    def response_stamp(self):
+        # 응답 캐시 확인용. 합치지 않은 편집이 있으면 본 파일 대신 마지막 편집 시각/판으로
+        if self.log:
+            return (self.modified_ns, -1, self.version)
+        return (self.stamp[0], self.stamp[1], self.version)
+
+    def table(self, first=0, last=None):
+        columns = self.columns
+        return columns, [[row.get(column) for column in columns] for row in self.rows[first:last]]
+
+
+class SheetCatalog:
+    # 저장 폴더의 시트 목록 + (크기, 행/열 수, 수정 시각) 캐시.
+    # 요청마다 폴더 mtime 만 보고, 바뀌었거나 CATALOG_RESCAN 이 지나면 scandir 로 다시 훑는다.
+    # 행/열 수는 저장할 때 알려 주고, 밖에서 바뀐 파일은 백그라운드 스레드가 읽어서 센다 (그동안은 None).
+    def __init__(self, store):
+        self.store = store
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._dir_stamp = None
+        self._scanned = 0.0
+        self._counting = queue.Queue()
+        self._thread = None
+
+    def refresh(self, force=False):
+        root = self.store.root
+        dir_stamp = os.stat(root).st_mtime_ns
+        now = time.monotonic()
+        if not force and dir_stamp == self._dir_stamp and now - self._scanned < CATALOG_RESCAN:
+            return
+        found = {}
+        with os.scandir(root) as it:
+            for item in it:
+                if item.name.endswith('.json') and item.is_file():
+                    st = item.stat()
+                    found[item.name] = (st.st_mtime_ns, st.st_size)
+        stale = []
+        with self._lock:
+            entries = {}
+            for name, stamp in found.items():
+                entry = self.entries.get(name)
+                if entry is None or entry['stamp'] != stamp:
+                    entry = {'stamp': stamp, 'rows': None, 'cols': None}
+                    stale.append((name, stamp))
+                entries[name] = entry
+            self.entries = entries
+            self._dir_stamp = dir_stamp
+            self._scanned = now
+        for item in stale:
+            self._counting.put(item)
+        if stale and self._thread is None:
+            self._thread = threading.Thread(target=self._count_worker, name="sheet-catalog", daemon=True)
+            self._thread.start()
+
+    def saved(self, filename, rows, cols):
+        # /save 직후: 이미 아는 행/열 수로 바로 갱신
+        st = os.stat(self.store.path(filename))
+        with self._lock:
+            self.entries[filename] = {'stamp': (st.st_mtime_ns, st.st_size), 'rows': rows, 'cols': cols}
+
+    def _count_worker(self):
+        while True:
+            name, stamp = self._counting.get()
+            with self._lock:
+                entry = self.entries.get(name)
+                if entry is None or entry['stamp'] != stamp or entry['rows'] is not None:
+                    continue
+            try:
+                sheet_rows = self.store.read_sheet(name)
+                if sheet_rows is None:
+                    continue
+                rows, cols = sheet_shape(*sheet_rows)
+            except (OSError, ValueError):
+                continue
+            with self._lock:
+                entry = self.entries.get(name)
+                if entry is not None and entry['stamp'] == stamp:
+                    entry['rows'] = rows
+                    entry['cols'] = cols
+
+    def query(self, prefix=None, sort='name', descending=False, offset=0, limit=None):
+        # {'total': 조건에 맞는 전체 수, 'items': [{name, size, rows, cols, modified}, ...]}
+        self.refresh()
+        with self._lock:
+            items = [
+                {
+                    'name': name,
+                    'size': entry['stamp'][1],
+                    'rows': entry['rows'],
+                    'cols': entry['cols'],
+                    'modified': datetime.fromtimestamp(entry['stamp'][0] / 1e9).isoformat(timespec='seconds'),
+                }
+                for name, entry in self.entries.items()
+                if not prefix or name.startswith(prefix)
+            ]
+        if sort == 'name':
+            items.sort(key=lambda item: item['name'], reverse=descending)
+        else:
+            # 아직 세지 못한 행/열 수(None)는 맨 앞(오름차순). modified 는 ISO 문자열이라 그대로 비교
+            items.sort(key=lambda item: (item[sort] is not None, item[sort] or 0, item['name']), reverse=descending)
+        total = len(items)
+        end = None if limit is None else offset + limit
+        return {'total': total, 'items': items[offset:end]}
+
+
+class SheetStore:
+    # SAVE_PATH 아래 시트(JSON 파일) 읽기/쓰기. 모두 블로킹 함수이므로 핸들러에서는 스레드풀로 호출한다.
+    # 응답 캐시: 파일별 CachedResponse 를 (mtime_ns, size) 로 확인하고, 전체 크기가 cache_bytes 를 넘으면 LRU 로 버린다.
+    # /query 색인(SheetIndex)의 어림 크기도 같은 cache_bytes 안에 센다.
+    # 파일은 SHEET_FORMAT 으로 저장하고 (compress=True 면 gzip), 예전 [{}, {}, {}] 파일은 처음 읽을 때 바꿔 쓴다.
+    def __init__(self, root, cache_bytes=256 * 1024 * 1024, compress=False):
+        self.root = root
+        self.cache_bytes = cache_bytes
+        self.compress = compress
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._responses_lock = threading.Lock()
+        # 파일별 무효화 횟수: 읽는 도중 저장되면 읽은 결과를 캐시에 넣지 않는다
+        self._generations = {}
+        self.catalog = SheetCatalog(self)
+        self._row_indexes = OrderedDict()
+        self._sheet_indexes = OrderedDict()
+        # 파일별 편집 상태(LiveSheet). 만들고 바꾸는 것은 해당 파일의 lock 안에서만
+        self._sheets = {}
+        self._compacting = queue.Queue()
+        self._compactor = None
+
+    def path(self, filename):
+        return os.path.join(self.root, filename)
+
+    def lock(self, filename):
+        # 파일별 쓰기 잠금 (같은 파일에 대한 저장은 순서대로)
+        with self._locks_lock:
+            lock = self._locks.get(filename)
+            if lock is None:
+                lock = self._locks[filename] = threading.Lock()
+            return lock
+
+    def save(self, filename, headers, data):
+        # headers + data 를 그대로 저장 (읽을 때 [{}, {}, {}] 로 바꾼다). 새 판 번호를 돌려준다 (쌓여 있던 편집은 버려짐)
+        # 열 이름보다 긴 행은 예전처럼 (zip) 넘치는 칸을 버린다
+        width = len(headers)
+        rows = [row if len(row) <= width else row[:width] for row in data]
+        payload = encode_sheet(headers, rows, self.compress)
+        with self.lock(filename):
+            try:
+                version = self._sheet(filename).version
+            except FileNotFoundError:
+                version = 0
+            atomic_write(self.path(filename), payload)
+            st = os.stat(self.path(filename))
+            sheet = self._sheets[filename] = LiveSheet((st.st_mtime_ns, st.st_size), version + 1, [], False)
+            # 방금 새 형식으로 썼으므로 읽을 때 다시 확인하지 않는다
+            sheet.checked = True
+            self._write_log_header(filename, sheet)
+            self.invalidate(filename)
+            self.catalog.saved(filename, *sheet_shape(headers, rows))
+            return sheet.version
+
+    def patch(self, filename, version, edits):
+        # 판 version 을 기준으로 한 편집을 변경 로그에 덧붙이고 메모리 사본에 적용한다 (본 파일은 나중에 한꺼번에).
+        # 새 판 번호를 돌려준다. 판이 다르면 VersionConflict, 편집이 맞지 않으면 ValueError, 파일이 없으면 FileNotFoundError
+        with self.lock(filename):
+            sheet = self._sheet(filename)
+            if version != sheet.version:
+                raise VersionConflict(sheet.version)
+            if not edits:
+                return sheet.version
+            self._materialize(filename, sheet)
+            check_edits(sheet.columns, len(sheet.rows), edits)
+            if not sheet.logged:
+                self._write_log_header(filename, sheet)
+            line = json.dumps({'version': sheet.version + 1, 'edits': edits}, ensure_ascii=False) + '\n'
+            with open(self._log_path(filename), 'ab') as f:
+                f.write(line.encode('utf-8'))
+                f.flush()
+                os.fsync(f.fileno())
+            apply_edits(sheet.columns, sheet.rows, edits)
+            sheet.log.append(edits)
+            sheet.version += 1
+            sheet.modified_ns = time.time_ns()
+            self.invalidate(filename)
+            self.catalog.saved(filename, len(sheet.rows), len(sheet.columns) if sheet.rows else 0)
+            self._schedule_compact(filename, sheet)
+            return sheet.version
+
+    def _log_path(self, filename):
+        # 변경 로그: 첫 줄은 {"base": 판, "stamp": 본 파일 stamp}, 이후 한 줄에 편집 묶음 하나 (목록에는 안 보이게 . 으로 시작)
+        return self.path(f".{filename}.log")
+
+    def _write_log_header(self, filename, sheet):
+        header = json.dumps({'base': sheet.version, 'stamp': list(sheet.stamp)}) + '\n'
+        atomic_write(self._log_path(filename), header.encode('utf-8'))
+        sheet.logged = True
+
+    def _sheet(self, filename):
+        # 파일의 편집 상태 (self.lock(filename) 을 잡은 채로 부른다). 파일이 없으면 FileNotFoundError
+        try:
+            st = os.stat(self.path(filename))
+        except FileNotFoundError:
+            self._sheets.pop(filename, None)
+            raise
+        stamp = (st.st_mtime_ns, st.st_size)
+        sheet = self._sheets.get(filename)
+        if sheet is not None and sheet.stamp == stamp:
+            return sheet
+        if sheet is None:
+            sheet = self._read_log(filename, stamp)
+        else:
+            # 본 파일이 밖에서 바뀜: 쌓인 편집은 버리고 새 판으로
+            sheet = LiveSheet(stamp, sheet.version + 1, [], False)
+            self._write_log_header(filename, sheet)
+        self._sheets[filename] = sheet
+        return sheet
+
+    def _read_sheet_state(self, filename):
+        # 읽기 쪽에서 쓰는 _sheet: 예전 형식 파일이면 처음 읽을 때 한 번 새 형식으로 바꿔 쓴다.
+        # 저장/편집 쪽은 어차피 새 형식으로 쓰므로 _sheet 만 부른다
+        sheet = self._sheet(filename)
+        if not sheet.checked and not sheet.log:
+            self._migrate(filename, sheet)
+            sheet.checked = True
+        return sheet
+
+    def _migrate(self, filename, sheet):
+        # 예전 형식([{}, {}, ...]) 파일을 새 형식으로 바꿔 쓴다. 판 번호는 그대로.
+        # 모든 행의 키가 같을 때만 (그래야 [{}, {}, {}] 로 그대로 되돌릴 수 있음). 아니면 예전 형식으로 둔다
+        # 표준 json 으로 읽고, 새로 쓴 내용을 다시 읽어 원래 값과 같을 때만 바꿔 쓴다 (NaN 이 null 이 되는 경우 등)
+        # 앞부분만 보고 예전 형식이 아니면 (새 형식, gzip 등) 나머지는 읽지 않는다
+        with open(self.path(filename), 'rb') as f:
+            head = b''
+            while True:
+                chunk = f.read(64)
+                head = (head + chunk).lstrip()
+                if head or not chunk:
+                    break
+            if not head.startswith(b'['):
+                return
+            raw = head + f.read()
+        try:
+            rows = json.loads(raw)
+        except ValueError:
+            return
+        columns = uniform_columns(rows)
+        if columns is None:
+            return
+        payload = encode_sheet(columns, [list(row.values()) for row in rows], self.compress)
+        headers, converted = decode_sheet(payload)
+        if std_dumps(to_records(headers, converted)) != std_dumps(rows):
+            return
+        atomic_write(self.path(filename), payload)
+        st = os.stat(self.path(filename))
+        sheet.stamp = (st.st_mtime_ns, st.st_size)
+        sheet.modified_ns = st.st_mtime_ns
+        if sheet.logged:
+            self._write_log_header(filename, sheet)
+        self.invalidate(filename)
+        self.catalog.saved(filename, len(rows), len(columns) if rows else 0)
+
+    def _read_log(self, filename, stamp):
+        # 디스크의 변경 로그로 편집 상태를 되살린다 (서버를 다시 띄운 경우)
+        try:
+            with open(self._log_path(filename), 'rb') as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return LiveSheet(stamp, 0, [], False)
+        header = None
+        log = []
+        version = 0
+        clean = True
+        for line in lines:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                # 쓰다 만 마지막 줄
+                clean = False
+                break
+            if header is None:
+                header = item
+                version = item['base']
+            else:
+                log.append(item['edits'])
+                version = item['version']
+        if header is None or tuple(header['stamp']) != stamp:
+            # 로그가 이 본 파일의 것이 아님 (밖에서 바뀌었거나 합친 직후 멈춤): 편집은 이미 반영됐거나 버린다
+            sheet = LiveSheet(stamp, version + 1, [], False)
+            self._write_log_header(filename, sheet)
+            return sheet
+        sheet = LiveSheet(stamp, version, log, True)
+        if not clean:
+            self._write_log_header(filename, LiveSheet(stamp, header['base'], [], False))
+            with open(self._log_path(filename), 'ab') as f:
+                for number, edits in enumerate(log, start=header['base'] + 1):
+                    f.write((json.dumps({'version': number, 'edits': edits}, ensure_ascii=False) + '\n').encode('utf-8'))
+        if log:
+            self._schedule_compact(filename, sheet)
+        return sheet
+
+    def _materialize(self, filename, sheet):
+        # 메모리 사본을 만든다 (본 파일 + 로그의 편집)
+        if sheet.rows is not None:
+            return
+        headers, rows = self.read_sheet(filename)
+        if headers is not None:
+            sheet.columns = list(dict.fromkeys(headers))
+            sheet.rows = to_records(headers, rows)
+        elif isinstance(rows, list) and all(isinstance(row, dict) for row in rows):
+            sheet.columns = list(dict.fromkeys(key for row in rows for key in row))
+            sheet.rows = rows
+        else:
+            raise ValueError("행(객체) 배열이 아닌 파일은 부분 저장할 수 없습니다.")
+        for edits in sheet.log:
+            apply_edits(sheet.columns, sheet.rows, edits)
+
+    def _schedule_compact(self, filename, sheet):
+        sheet.touched = time.monotonic()
+        if sheet.queued:
+            return
+        sheet.queued = True
+        self._compacting.put(filename)
+        with self._locks_lock:
+            if self._compactor is None:
+                self._compactor = threading.Thread(target=self._compact_worker, name="sheet-compact", daemon=True)
+                self._compactor.start()
+
+    def _compact_worker(self):
+        # 편집이 잠잠해지면(또는 로그가 길어지면) 본 파일을 새로 쓰고 로그를 비운다
+        while True:
+            filename = self._compacting.get()
+            while True:
+                with self.lock(filename):
+                    sheet = self._sheets.get(filename)
+                    if sheet is None or not sheet.log:
+                        if sheet is not None:
+                            sheet.queued = False
+                        break
+                    wait = sheet.touched + COMPACT_DELAY - time.monotonic()
+                    if wait <= 0 or len(sheet.log) >= COMPACT_EDITS:
+                        try:
+                            self._compact(filename, sheet)
+                            sheet.queued = False
+                            break
+                        except (OSError, ValueError):
+                            # 편집은 로그에 안전하게 남아 있으므로 잠시 뒤 다시 시도
+                            sheet.touched = time.monotonic()
+                            wait = COMPACT_DELAY
+                time.sleep(min(wait, 1.0))
+
+    def _compact(self, filename, sheet):
+        self._materialize(filename, sheet)
+        rows, cols = len(sheet.rows), len(sheet.columns) if sheet.rows else 0
+        payload = encode_sheet(*sheet.table(), self.compress)
+        atomic_write(self.path(filename), payload)
+        st = os.stat(self.path(filename))
+        sheet.stamp = (st.st_mtime_ns, st.st_size)
+        sheet.modified_ns = st.st_mtime_ns
+        sheet.log = []
+        sheet.columns = sheet.rows = None
+        sheet.checked = True
+        # 여기서 멈추면 다음에 읽을 때 로그의 stamp 가 맞지 않아 (이미 합친) 편집을 버린다
+        self._write_log_header(filename, sheet)
+        self.invalidate(filename)
+        self.catalog.saved(filename, rows, cols)
+
+    def compact(self, filename):
+        # 쌓인 편집을 지금 바로 본 파일에 합친다
+        with self.lock(filename):
+            sheet = self._sheets.get(filename)
+            if sheet is not None and sheet.log:
+                self._compact(filename, sheet)
+
+    def read_sheet(self, filename):
+        # (headers, rows) - decode_sheet 참고. 파일이 없으면 None
+        try:
+            with open(self.path(filename), "rb") as f:
+                raw = f.read()
+        except FileNotFoundError:
+            return None
+        return decode_sheet(raw)
+
+    def list(self, prefix=None, sort='name', descending=False, offset=0, limit=None):
+        return self.catalog.query(prefix, sort, descending, offset, limit)
+
+    def response(self, filename, table=False):
+        # 캐시된 응답 (파일이 바뀌었으면 다시 읽어 직렬화). 파일이 없으면 None. 판 번호는 entry.stamp[2]
+        # table 이면 {"headers", "rows"}, 아니면 [{}, {}, {}] (표가 아닌 파일을 table 로 달라면 ValueError)
+        key = (filename, table)
+        sheet_rows = None
+        with self.lock(filename):
+            try:
+                sheet = self._read_sheet_state(filename)
+            except FileNotFoundError:
+                self.invalidate(filename)
+                return None
+            stamp = sheet.response_stamp()
+            with self._responses_lock:
+                entry = self._responses.get(key)
+                if entry is not None and entry.stamp == stamp:
+                    self._responses.move_to_end(key)
+                    return entry
+                generation = self._generations.get(filename, 0)
+            if sheet.log:
+                # 아직 합치지 않은 편집이 있으면 메모리 사본으로
+                self._materialize(filename, sheet)
+                sheet_rows = sheet.table()
+
+        if sheet_rows is None:
+            sheet_rows = self.read_sheet(filename)
+            if sheet_rows is None:
+                return None
+        body = dumps(shape_rows(*sheet_rows, table))
+        entry = CachedResponse(stamp, body)
+        with self._responses_lock:
+            if self._generations.get(filename, 0) == generation:
+                self._responses[key] = entry
+                self._trim()
+        return entry
+
+    def encoded(self, entry, encoding):
+        # 압축본을 만든 뒤 캐시 크기를 다시 맞춘다
+        data = entry.encoded(encoding)
+        with self._responses_lock:
+            self._trim()
+        return data
+
+    def invalidate(self, filename):
+        with self._responses_lock:
+            for table in (False, True):
+                self._responses.pop((filename, table), None)
+            self._row_indexes.pop(filename, None)
+            self._sheet_indexes.pop(filename, None)
+            self._generations[filename] = self._generations.get(filename, 0) + 1
+
+    def row_index(self, filename):
+        # 캐시된 행 색인 (파일이 바뀌었으면 다시 만든다). 파일이 없으면 FileNotFoundError, 색인할 수 없는 형식이면 None
+        st = os.stat(self.path(filename))
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self._responses_lock:
+            index = self._row_indexes.get(filename)
+            if index is not None and index.stamp == stamp:
+                self._row_indexes.move_to_end(filename)
+                return index
+        index = build_row_index(self.path(filename))
+        if index is not None:
+            with self._responses_lock:
+                self._row_indexes[filename] = index
+                while len(self._row_indexes) > ROW_INDEX_FILES:
+                    self._row_indexes.popitem(last=False)
+        return index
+
+    def sheet_index(self, filename):
+        # /query 용 색인 (SheetIndex). 저장/편집하면 버리고 다음 쿼리 때 다시 만든다.
+        # 파일이 없으면 None, 표가 아닌 파일이면 ValueError
+        table = None
+        with self.lock(filename):
+            try:
+                sheet = self._read_sheet_state(filename)
+            except FileNotFoundError:
+                return None
+            stamp = sheet.response_stamp()
+            with self._responses_lock:
+                index = self._sheet_indexes.get(filename)
+                if index is not None and index.stamp == stamp:
+                    self._sheet_indexes.move_to_end(filename)
+                    return index
+                generation = self._generations.get(filename, 0)
+            if sheet.log:
+                self._materialize(filename, sheet)
+                table = sheet.table()
+        if table is None:
+            sheet_rows = self.read_sheet(filename)
+            if sheet_rows is None:
+                return None
+            table = to_table(*sheet_rows)
+        index = SheetIndex(stamp, stamp[2], *table)
+        with self._responses_lock:
+            if self._generations.get(filename, 0) == generation:
+                self._sheet_indexes[filename] = index
+                while len(self._sheet_indexes) > QUERY_INDEX_FILES:
+                    self._sheet_indexes.popitem(last=False)
+                self._trim()
+        return index
+
+    def query(self, filename, equals=(), contains=(), sort=(), group_by=None, offset=0, limit=None):
+        # (색인, SheetIndex.query 결과). 파일이 없으면 (None, None). 열 색인은 쿼리하면서 늘어나므로 끝나고 캐시 크기를 다시 맞춘다
+        index = self.sheet_index(filename)
+        if index is None:
+            return None, None
+        result = index.query(equals, contains, sort, group_by, offset, limit)
+        with self._responses_lock:
+            self._trim()
+        return index, result
+
+    def _read_span(self, filename, index, first, last):
+        # 행 [first, last) 를 한 번에 읽어 파싱 (새 형식이면 배열, 예전 형식이면 객체). 색인을 만든 뒤 파일이 바뀌었으면 None
+        if first >= last:
+            return []
+        with open(self.path(filename), 'rb') as f:
+            st = os.fstat(f.fileno())
+            if (st.st_mtime_ns, st.st_size) != index.stamp:
+                return None
+            base = index.starts[first]
+            f.seek(base)
+            data = f.read(index.ends[last - 1] - base)
+        # 행 사이에는 쉼표와 공백뿐이므로 [ ] 로 감싸면 한 번에 파싱된다
+        return loads(b'[' + data + b']')
+
+    def _live_rows(self, filename, offset, limit, table):
+        # (판 번호, 합치지 않은 편집이 있으면 (전체 행 수, 메모리 사본의 행 [offset, offset+limit)) 아니면 None)
+        with self.lock(filename):
+            sheet = self._read_sheet_state(filename)
+            if not sheet.log:
+                return sheet.version, None
+            self._materialize(filename, sheet)
+            end = None if limit is None else offset + limit
+            return sheet.version, (len(sheet.rows), shape_rows(*sheet.table(offset, end), table))
+
+    def read_rows(self, filename, offset=0, limit=None, table=False):
+        # (전체 행 수, 행 [offset, offset+limit), 판 번호) - 전체 파일을 읽지 않고 색인으로 필요한 부분만. 파일이 없으면 None
+        # 행은 table 이면 {"headers", "rows"}, 아니면 [{}, {}, {}]
+        for _ in range(3):
+            try:
+                version, live = self._live_rows(filename, offset, limit, table)
+                if live is not None:
+                    return live + (version,)
+                index = self.row_index(filename)
+            except FileNotFoundError:
+                return None
+            if index is None:
+                break
+            last = len(index) if limit is None else min(len(index), offset + limit)
+            rows = self._read_span(filename, index, min(offset, last), last)
+            if rows is not None:
+                return len(index), shape_rows(index.headers, rows, table), version
+        # 색인할 수 없는 형식이거나 계속 바뀌는 중: 통째로 읽어서 자른다
+        sheet_rows = self.read_sheet(filename)
+        if sheet_rows is None:
+            return None
+        headers, data = sheet_rows
+        if not isinstance(data, list):
+            # 배열이 아닌 파일은 행 하나로 본다
+            data = [data]
+        end = None if limit is None else offset + limit
+        return len(data), shape_rows(headers, data[offset:end], table), version
+
+    def iter_ndjson(self, filename, offset=0, limit=None):
+        # 행을 ROW_BATCH 개씩 읽어 한 줄에 하나씩 JSON 객체로 내보낸다 (전체를 메모리에 올리지 않음).
+        # 배치마다 파일을 다시 열므로 스트리밍 중에도 저장이 막히지 않는다. 중간에 파일이 바뀌면 거기서 끝낸다.
+        try:
+            _, live = self._live_rows(filename, offset, limit, False)
+            index = None if live is not None else self.row_index(filename)
+        except FileNotFoundError:
+            return
+        if live is not None:
+            rows = live[1]
+            batches = (rows[first:first + ROW_BATCH] for first in range(0, len(rows), ROW_BATCH))
+        elif index is None:
+            result = self.read_rows(filename, offset, limit)
+            batches = [result[1]] if result else []
+        else:
+            end = len(index) if limit is None else min(len(index), offset + limit)
+            batches = (self._read_span(filename, index, first, min(first + ROW_BATCH, end))
+                       for first in range(offset, end, ROW_BATCH))
+        for rows in batches:
+            if rows is None:
+                return
+            if index is not None:
+                rows = to_records(index.headers, rows)
+            yield b''.join(dumps(row) + b'\n' for row in rows)
+
+    def _trim(self):
+        # 응답과 /query 색인 크기 합이 cache_bytes 를 넘으면 오래 안 쓴 것부터 버린다.
+        # 색인이 절반 넘게 차지하면 색인부터. 가장 최근 응답/색인 하나씩은 남긴다
+        responses = sum(entry.size() for entry in self._responses.values())
+        indexes = sum(index.size() for index in self._sheet_indexes.values())
+        while responses + indexes > self.cache_bytes:
+            if len(self._sheet_indexes) > 1 and (indexes * 2 > self.cache_bytes or len(self._responses) <= 1):
+                _, index = self._sheet_indexes.popitem(last=False)
+                indexes -= index.size()
+            elif len(self._responses) > 1:
+                _, entry = self._responses.popitem(last=False)
+                responses -= entry.size()
+            else:
+                break